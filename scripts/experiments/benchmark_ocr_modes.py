@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark phase2 OCR modes on a raw root.
+
+For each app, OCR the step screenshots referenced by tupleOfPermissions.json
+with the legacy multiscale loop and with the adaptive engine, then report:
+  - tesseract seconds per app for both modes and the time saved
+  - average tesseract passes per image in adaptive mode
+  - text recall of adaptive output against multiscale output
+    (unique-char and char-bigram recall, micro-averaged per app)
+
+Output:
+  <output> (default: <raw_root>/ocr_mode_benchmark.json)
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Set
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+SRC = os.path.join(ROOT, "src")
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+from configs import settings  # noqa: E402
+from data_pipline import data_process  # noqa: E402
+
+
+def _bigrams(text: str) -> Set[str]:
+    return {text[i : i + 2] for i in range(len(text) - 1)}
+
+
+def _recall(ref: Set[str], got: Set[str]) -> float:
+    if not ref:
+        return 1.0
+    return len(ref & got) / len(ref)
+
+
+def _referenced_images(app_dir: str, max_images: int) -> List[str]:
+    tp = os.path.join(app_dir, "tupleOfPermissions.json")
+    if not os.path.isfile(tp):
+        return []
+    try:
+        raw = data_process.read_json(tp)
+    except Exception:
+        return []
+    out: List[str] = []
+    seen = set()
+    for seq in raw if isinstance(raw, list) else []:
+        for name in seq if isinstance(seq, list) else []:
+            path = os.path.join(app_dir, str(name))
+            if path in seen or not os.path.isfile(path):
+                continue
+            seen.add(path)
+            out.append(path)
+            if max_images and len(out) >= max_images:
+                return out
+    return out
+
+
+def benchmark_app(app_dir: str, max_images: int, min_conf: float, min_chars: int) -> Dict[str, Any]:
+    images = _referenced_images(app_dir, max_images)
+    multi_seconds = 0.0
+    adaptive_seconds = 0.0
+    passes = 0
+    ref_chars: Set[str] = set()
+    got_chars: Set[str] = set()
+    ref_bigrams: Set[str] = set()
+    got_bigrams: Set[str] = set()
+    legacy_len = 0
+    adaptive_len = 0
+
+    for idx, path in enumerate(images):
+        bin_img = data_process.ocr_preprocess(path)
+        if bin_img is None:
+            continue
+
+        ts = time.perf_counter()
+        legacy = data_process.ocr_image_multiscale(bin_img)
+        multi_seconds += time.perf_counter() - ts
+
+        ts = time.perf_counter()
+        adaptive, n = data_process.ocr_image_adaptive(bin_img, min_conf, min_chars)
+        adaptive_seconds += time.perf_counter() - ts
+        passes += n
+
+        # Prefix with the image index so identical snippets on different
+        # screens are counted separately.
+        ref_chars |= {f"{idx}:{c}" for c in legacy}
+        got_chars |= {f"{idx}:{c}" for c in adaptive}
+        ref_bigrams |= {f"{idx}:{b}" for b in _bigrams(legacy)}
+        got_bigrams |= {f"{idx}:{b}" for b in _bigrams(adaptive)}
+        legacy_len += len(legacy)
+        adaptive_len += len(adaptive)
+
+    saved = multi_seconds - adaptive_seconds
+    return {
+        "app": os.path.basename(app_dir),
+        "images": len(images),
+        "multiscale_seconds": round(multi_seconds, 3),
+        "adaptive_seconds": round(adaptive_seconds, 3),
+        "saved_seconds": round(saved, 3),
+        "saved_ratio": round(saved / multi_seconds, 4) if multi_seconds else 0.0,
+        "adaptive_avg_passes": round(passes / len(images), 3) if images else 0.0,
+        "char_recall": round(_recall(ref_chars, got_chars), 4),
+        "bigram_recall": round(_recall(ref_bigrams, got_bigrams), 4),
+        "multiscale_text_chars": legacy_len,
+        "adaptive_text_chars": adaptive_len,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark multiscale vs adaptive phase2 OCR")
+    parser.add_argument("raw_root", nargs="?", default=settings.DATA_RAW_DIR)
+    parser.add_argument("--app-prefix", default="fastbot-", help="filter app dirs by prefix")
+    parser.add_argument("--max-apps", type=int, default=20)
+    parser.add_argument("--max-images", type=int, default=30, help="per app, 0 means all referenced steps")
+    parser.add_argument("--min-conf", type=float, default=settings.PHASE2_OCR_MIN_CONF)
+    parser.add_argument("--min-chars", type=int, default=settings.PHASE2_OCR_MIN_CHARS)
+    parser.add_argument("--output", default="")
+    args = parser.parse_args()
+
+    raw_root = os.path.abspath(args.raw_root)
+    app_dirs = [
+        os.path.join(raw_root, d)
+        for d in sorted(os.listdir(raw_root))
+        if d.startswith(args.app_prefix) and os.path.isdir(os.path.join(raw_root, d))
+    ]
+    if args.max_apps:
+        app_dirs = app_dirs[: args.max_apps]
+
+    rows: List[Dict[str, Any]] = []
+    for app_dir in app_dirs:
+        row = benchmark_app(app_dir, args.max_images, args.min_conf, args.min_chars)
+        rows.append(row)
+        print(
+            f"[BENCH] app={row['app']} images={row['images']} "
+            f"multiscale={row['multiscale_seconds']}s adaptive={row['adaptive_seconds']}s "
+            f"saved={row['saved_ratio']:.1%} passes={row['adaptive_avg_passes']} "
+            f"bigram_recall={row['bigram_recall']}"
+        )
+
+    total_multi = sum(r["multiscale_seconds"] for r in rows)
+    total_adaptive = sum(r["adaptive_seconds"] for r in rows)
+    total_images = sum(r["images"] for r in rows)
+    measured = [r for r in rows if r["images"]]
+    summary = {
+        "raw_root": raw_root,
+        "apps": len(rows),
+        "images": total_images,
+        "min_conf": args.min_conf,
+        "min_chars": args.min_chars,
+        "multiscale_seconds": round(total_multi, 3),
+        "adaptive_seconds": round(total_adaptive, 3),
+        "saved_seconds_per_app": round((total_multi - total_adaptive) / len(measured), 3) if measured else 0.0,
+        "saved_ratio": round((total_multi - total_adaptive) / total_multi, 4) if total_multi else 0.0,
+        "mean_char_recall": round(sum(r["char_recall"] for r in measured) / len(measured), 4) if measured else 0.0,
+        "mean_bigram_recall": round(sum(r["bigram_recall"] for r in measured) / len(measured), 4) if measured else 0.0,
+        "per_app": rows,
+    }
+
+    out_path = args.output or os.path.join(raw_root, "ocr_mode_benchmark.json")
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    print(f"\n[SAVED] benchmark={out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -80,6 +80,8 @@ def parse_chain_id(item: Dict[str, Any], fallback: int) -> int:
 
 
 def map_by_chain_id(items: Any) -> Dict[int, Dict[str, Any]]:
+    if isinstance(items, dict) and isinstance(items.get("chains"), list):
+        items = items["chains"]  # screen-store result.json
     out: Dict[int, Dict[str, Any]] = {}
     for i, raw in enumerate(items if isinstance(items, list) else []):
         if not isinstance(raw, dict):
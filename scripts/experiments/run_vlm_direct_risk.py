@@ -18,12 +18,21 @@ import base64
 import json
 import os
 import re
+import sys
 import time
 from collections import Counter
 from typing import Any, Dict, List, Optional, Set, Tuple
 
 import requests
 
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+SRC = os.path.join(ROOT, "src")
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+from data_pipline.chain_render import ChainRenderer, list_chain_ids  # noqa: E402
+from utils.http_retry import get_session, pool_stats  # noqa: E402
+
 
 OUTPUT_FILENAME = "result_vlm_direct_risk.json"
 SUMMARY_FILENAME = "vlm_direct_risk_summary.json"
@@ -55,12 +64,6 @@ def _ensure_no_proxy() -> None:
     os.environ["no_proxy"] = "127.0.0.1,localhost"
 
 
-def _new_session() -> requests.Session:
-    s = requests.Session()
-    s.trust_env = False
-    return s
-
-
 def _load_json(path: str) -> Any:
     if not os.path.exists(path):
         return None
@@ -91,13 +94,6 @@ def _extract_json(text: str) -> Dict[str, Any]:
     return {}
 
 
-def _parse_chain_id(filename: str) -> Optional[int]:
-    m = re.match(r"^chain_(\d+)\.png$", filename)
-    if not m:
-        return None
-    return int(m.group(1))
-
-
 def _iter_app_dirs(target: str, app_name: str, app_prefix: str) -> List[str]:
     if os.path.isfile(os.path.join(target, "result.json")):
         return [target]
@@ -118,14 +114,19 @@ def _iter_app_dirs(target: str, app_name: str, app_prefix: str) -> List[str]:
 
 
 def _chain_images(app_dir: str, chain_ids: Optional[Set[int]]) -> List[Tuple[int, str]]:
+    # Chains processed with --chain-images lazy are rendered here on first use.
+    renderer = ChainRenderer(app_dir)
     out: List[Tuple[int, str]] = []
-    for name in sorted(os.listdir(app_dir)):
-        cid = _parse_chain_id(name)
-        if cid is None:
-            continue
+    for cid in list_chain_ids(app_dir):
         if chain_ids is not None and cid not in chain_ids:
             continue
-        out.append((cid, os.path.join(app_dir, name)))
+        try:
+            path = renderer.ensure(cid)
+        except Exception as exc:
+            print(f"[WARN] app={os.path.basename(app_dir)} chain_id={cid} render_failed: {exc}")
+            continue
+        if os.path.exists(path):
+            out.append((cid, path))
     return out
 
 
@@ -366,7 +367,8 @@ def main() -> None:
     target = os.path.abspath(args.target)
     app_dirs = _iter_app_dirs(target=target, app_name=args.app, app_prefix=args.app_prefix)
 
-    session = _new_session()
+    # This script never used env proxies, whatever the host.
+    session = get_session(args.vllm_url, trust_env=False)
     apps_total = len(app_dirs)
     apps_run = 0
     apps_failed = 0
@@ -416,6 +418,7 @@ def main() -> None:
         "fallback_distribution": dict(fb_counter),
         "vllm_url": args.vllm_url,
         "model": args.model,
+        "http_pool": pool_stats(),
         "timeout": args.timeout,
         "max_retries": args.max_retries,
     }
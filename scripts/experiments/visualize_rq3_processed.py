@@ -196,6 +196,8 @@ def collect_dataset(processed_root: Path) -> Dict[str, Any]:
         if result_path.exists():
             try:
                 result_rows = _load_json(result_path)
+                if isinstance(result_rows, dict):
+                    result_rows = result_rows.get("chains")  # screen-store result.json
                 if isinstance(result_rows, list):
                     result_chain_count = len(result_rows)
             except Exception:
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fake adb for exercising phase1 without devices.
+
+Usage:
+  export LLMMUI_ADB_BIN="python3 scripts/test/fake_adb.py"
+  export FAKE_ADB_DEVICES=emulator-5554,emulator-5556   # attached serials
+  export FAKE_ADB_ROOT=/tmp/llmmui_fake_adb             # device storage + call log
+  python3 src/main.py phase1 <apk_dir> --devices all
+
+Supported: devices, install, uninstall, shell rm -rf, shell <fastbot command>,
+exec-out (run by the local sh), pull, shell pkill. The fastbot command runs for
+FAKE_ADB_FASTBOT_SECONDS while writing FAKE_ADB_STEPS steps (png + xml) and
+FAKE_ADB_TUPLES early permission tuples into the fake device storage; pkill
+stops it. Every call is appended to <FAKE_ADB_ROOT>/calls.jsonl.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import shutil
+import signal
+import struct
+import subprocess
+import sys
+import time
+import zlib
+from typing import List, Optional
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+SRC = os.path.join(ROOT, "src")
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+from configs import settings  # noqa: E402
+
+FAKE_ROOT = os.getenv("FAKE_ADB_ROOT", "/tmp/llmmui_fake_adb")
+DEVICES = [s.strip() for s in os.getenv("FAKE_ADB_DEVICES", "emulator-5554,emulator-5556").split(",") if s.strip()]
+FASTBOT_SECONDS = float(os.getenv("FAKE_ADB_FASTBOT_SECONDS", "1"))
+STEPS = max(3, int(os.getenv("FAKE_ADB_STEPS", "12")))
+TUPLES = max(1, int(os.getenv("FAKE_ADB_TUPLES", "2")))
+
+
+def _png(width: int = 9, height: int = 16) -> bytes:
+    """Plain white RGB PNG (portrait, so phase2 treats it like a phone screenshot)."""
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+    rows = b"".join(b"\x00" + b"\xff" * (3 * width) for _ in range(height))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(rows))
+        + chunk(b"IEND", b"")
+    )
+
+
+_DIALOG_XML = (
+    '<?xml version="1.0" encoding="UTF-8"?><hierarchy rotation="0">'
+    '<node text="允许访问位置信息?" class="android.widget.TextView" '
+    'resource-id="com.android.permissioncontroller:id/permission_message" bounds="[0,0][1,1]"/>'
+    '<node text="拒绝" class="android.widget.Button" '
+    'resource-id="com.android.permissioncontroller:id/permission_deny_button" bounds="[0,0][1,1]"/>'
+    "</hierarchy>"
+)
+_PAGE_XML = (
+    '<?xml version="1.0" encoding="UTF-8"?><hierarchy rotation="0">'
+    '<node text="首页" class="android.widget.TextView" resource-id="com.app:id/title" bounds="[0,0][1,1]"/>'
+    "</hierarchy>"
+)
+
+
+def _die(msg: str, code: int = 1) -> None:
+    sys.stderr.write(f"adb: {msg}\n")
+    sys.exit(code)
+
+
+def _log(serial: Optional[str], argv: List[str]) -> None:
+    os.makedirs(FAKE_ROOT, exist_ok=True)
+    with open(os.path.join(FAKE_ROOT, "calls.jsonl"), "a", encoding="utf-8") as f:
+        f.write(json.dumps({"ts": time.time(), "pid": os.getpid(), "serial": serial, "argv": argv}) + "\n")
+
+
+def _storage(serial: str, remote: str) -> str:
+    return os.path.join(FAKE_ROOT, serial, remote.lstrip("/"))
+
+
+def _pid_path(serial: str) -> str:
+    return os.path.join(FAKE_ROOT, serial, "fastbot.pid")
+
+
+def _fastbot(serial: str, command: str) -> None:
+    """
+    Write one step every FASTBOT_SECONDS / STEPS seconds. Permission dialogs
+    appear at steps 2, 5, 8, ... (FAKE_ADB_TUPLES of them), and each tuple is
+    added to tupleOfPermissions.json once its closing step exists, so the
+    tuple count plateaus early, like a real app running out of new screens.
+    """
+    pkg = re.search(r"-p\s+(\S+)", command)
+    minutes = re.search(r"--running-minutes\s+(\d+)", command)
+    if not pkg or not minutes:
+        _die("fake fastbot: cannot parse command")
+    name = settings.FASTBOT_OUTPUT_TEMPLATE.format(package=pkg.group(1), time=minutes.group(1))
+    out = _storage(serial, f"{settings.ANDROID_DATA_DIR}/{name}")
+    os.makedirs(out, exist_ok=True)
+    with open(_pid_path(serial), "w") as f:
+        f.write(str(os.getpid()))
+
+    dialogs = [d for d in (2 + 3 * k for k in range(TUPLES)) if d < STEPS]
+    tuples = []
+    for i in range(1, STEPS + 1):
+        time.sleep(FASTBOT_SECONDS / STEPS)
+        with open(os.path.join(out, f"step-{i}-fake.png"), "wb") as f:
+            f.write(_png())
+        with open(os.path.join(out, f"step-{i}-fake.xml"), "w", encoding="utf-8") as f:
+            f.write(_DIALOG_XML if i in dialogs else _PAGE_XML)
+        if i - 1 in dialogs:
+            tuples.append([f"step-{j}-fake.png" for j in (i - 2, i - 1, i)])
+        with open(os.path.join(out, "tupleOfPermissions.json"), "w", encoding="utf-8") as f:
+            json.dump(tuples, f)
+    os.remove(_pid_path(serial))
+
+
+def _pkill(serial: str) -> None:
+    try:
+        with open(_pid_path(serial)) as f:
+            os.kill(int(f.read().strip()), signal.SIGTERM)
+        os.remove(_pid_path(serial))
+    except (OSError, ValueError):
+        pass
+
+
+def main(argv: List[str]) -> None:
+    serial = None
+    if len(argv) >= 2 and argv[0] == "-s":
+        serial, argv = argv[1], argv[2:]
+    _log(serial, argv)
+    if not argv:
+        _die("no command")
+
+    cmd, args = argv[0], argv[1:]
+    if cmd == "devices":
+        print("List of devices attached")
+        for s in DEVICES:
+            print(f"{s}\tdevice")
+        return
+
+    if serial is None:
+        if len(DEVICES) != 1:
+            _die("more than one device/emulator" if DEVICES else "no devices/emulators found")
+        serial = DEVICES[0]
+    elif serial not in DEVICES:
+        _die(f"device '{serial}' not found")
+
+    if cmd == "install":
+        if not args or not os.path.exists(args[-1]):
+            _die("install: apk not found")
+        print("Success")
+    elif cmd == "uninstall":
+        print("Success")
+    elif cmd == "shell":
+        command = " ".join(args)
+        if args[:2] == ["rm", "-rf"]:
+            for remote in args[2:]:
+                shutil.rmtree(_storage(serial, remote), ignore_errors=True)
+        elif args[:1] == ["pkill"]:
+            _pkill(serial)
+        elif "com.android.commands.monkey.Monkey" in command:
+            _fastbot(serial, command)
+        else:
+            _die(f"fake shell: unsupported command: {command}")
+    elif cmd == "exec-out":
+        # Run the device command with the local sh, device paths mapped into the fake storage.
+        data_dir = settings.ANDROID_DATA_DIR
+        command = " ".join(args).replace(data_dir, _storage(serial, data_dir))
+        sys.exit(subprocess.run(["sh", "-c", command]).returncode)
+    elif cmd == "pull":
+        if len(args) < 2:
+            _die("pull: expected <remote>... <local>")
+        *remotes, local = args
+        for remote in remotes:
+            src = _storage(serial, remote)
+            if os.path.isdir(src):
+                shutil.copytree(src, os.path.join(local, os.path.basename(remote.rstrip("/"))), dirs_exist_ok=True)
+            elif os.path.isfile(src):
+                shutil.copy(src, local)
+            else:
+                _die(f"remote object '{remote}' does not exist")
+        print(f"{len(remotes)} file(s) pulled")
+    else:
+        _die(f"fake adb: unsupported command: {cmd}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
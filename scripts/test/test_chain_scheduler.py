@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Offline check of chain_scheduler.run_app_pipelines failure handling.
+
+Usage:
+  python3 scripts/test/test_chain_scheduler.py
+
+A second-stage failure on the first chain must fail only the second stage of
+that app: the first stage still finishes, and `then` is not called again for
+the app's remaining chains.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+SRC = os.path.join(ROOT, "src")
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+from analy_pipline.common.chain_scheduler import AppBatch, AppPipeline, run_app_pipelines  # noqa: E402
+
+
+def test_second_stage_failure_stops_then() -> None:
+    then_calls = []
+
+    def first_task(idx: int):
+        def task():
+            # Later chains come back after the first chain's second stage has failed.
+            time.sleep(0.2 * idx)
+            return idx
+        return task
+
+    def then(value: int):
+        then_calls.append(value)
+
+        def task():
+            raise RuntimeError(f"llm failed chain={value}")
+        return task
+
+    def plan(app_dir: str) -> AppPipeline:
+        return AppPipeline(
+            first=AppBatch(app_dir, [first_task(i) for i in range(3)], finish=lambda results: results),
+            then=then,
+            finish=lambda results: results,
+        )
+
+    first, second = run_app_pipelines(["app"], plan, concurrency=(1, 1))
+    assert first.done == {"app": [0, 1, 2]}, first
+    assert list(second.failed) == ["app"], second
+    assert then_calls == [0], then_calls
+
+
+if __name__ == "__main__":
+    test_second_stage_failure_stops_then()
+    print("ok")
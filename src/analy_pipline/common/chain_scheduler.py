@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""
+Per-chain work scheduling for phase3_v2 stages.
+
+A stage plans each app into an `AppBatch`: one task per chain (the endpoint
+call) plus a `finish` that writes the app's output files from the task
+results, in task order. `run_app_batches` puts the tasks of every app into
+one queue drained by a shared pool, so requests keep flowing across app
+boundaries; each app is finished as soon as its last chain is back.
+
+`run_app_pipelines` chains two such stages that talk to different
+endpoints: each first-stage result immediately becomes a second-stage task
+on a second pool, so both endpoints are busy at the same time.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from tqdm import tqdm
+
+
+@dataclass
+class AppBatch:
+    app_dir: str
+    tasks: List[Callable[[], Any]]
+    finish: Callable[[List[Any]], Any]
+
+    def run(self, concurrency: int = 1, desc: Optional[str] = None) -> Any:
+        """Run this app on its own (the per-app path) and return finish(results)."""
+        tasks = self.tasks
+        if concurrency <= 1 or len(tasks) <= 1:
+            it = (task() for task in tasks)
+            results = list(tqdm(it, total=len(tasks), desc=desc, ncols=90) if desc else it)
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="chain") as executor:
+                it = executor.map(lambda task: task(), tasks)
+                results = list(tqdm(it, total=len(tasks), desc=desc, ncols=90) if desc else it)
+        return self.finish(results)
+
+
+@dataclass
+class ScheduleResult:
+    done: Dict[str, Any] = field(default_factory=dict)  # app_dir -> finish() return value
+    failed: Dict[str, BaseException] = field(default_factory=dict)
+
+
+def run_app_batches(
+    app_dirs: Iterable[str],
+    plan: Callable[[str], Optional[AppBatch]],
+    concurrency: int,
+    desc: str = "chains",
+) -> ScheduleResult:
+    """
+    plan(app_dir) runs on the calling thread, app by app, while the pool is
+    already working on earlier apps; it returns None when the app has nothing
+    to do. finish() also runs on the calling thread, so output writes never
+    race. A failing plan, task or finish fails only its own app: its queued
+    chains are cancelled and no output is written for it.
+    """
+    result = ScheduleResult()
+    pending: Dict[Future, tuple] = {}
+    slots: Dict[str, List[Any]] = {}
+    remaining: Dict[str, int] = {}
+    batches: Dict[str, AppBatch] = {}
+    bar = tqdm(total=0, desc=desc, ncols=90)
+
+    def fail(app_dir: str, exc: BaseException) -> None:
+        result.failed[app_dir] = exc
+        remaining.pop(app_dir, None)
+        for fut, (owner, _) in list(pending.items()):
+            if owner == app_dir and fut.cancel():
+                pending.pop(fut)
+        print(f"[ChainScheduler][WARN] app failed app={app_dir} err={exc}")
+
+    def finish(app_dir: str) -> None:
+        batch = batches.pop(app_dir)
+        remaining.pop(app_dir, None)
+        try:
+            result.done[app_dir] = batch.finish(slots.pop(app_dir))
+        except Exception as exc:
+            fail(app_dir, exc)
+
+    def collect(done: Set[Future]) -> None:
+        for fut in done:
+            if fut not in pending:
+                continue
+            app_dir, idx = pending.pop(fut)
+            bar.update(1)
+            if app_dir in result.failed:
+                continue
+            exc = fut.exception()
+            if exc is not None:
+                fail(app_dir, exc)
+                continue
+            slots[app_dir][idx] = fut.result()
+            remaining[app_dir] -= 1
+            if remaining[app_dir] == 0:
+                finish(app_dir)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="chain-sched") as executor:
+        try:
+            for app_dir in app_dirs:
+                try:
+                    batch = plan(app_dir)
+                except Exception as exc:
+                    fail(app_dir, exc)
+                    continue
+                if batch is None:
+                    result.done[app_dir] = None
+                    continue
+                batches[app_dir] = batch
+                slots[app_dir] = [None] * len(batch.tasks)
+                remaining[app_dir] = len(batch.tasks)
+                bar.total += len(batch.tasks)
+                bar.refresh()
+                if not batch.tasks:
+                    finish(app_dir)
+                    continue
+                for idx, task in enumerate(batch.tasks):
+                    pending[executor.submit(task)] = (app_dir, idx)
+                # Write out apps that completed while this one was being planned.
+                collect({fut for fut in pending if fut.done()})
+
+            while pending:
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                collect(done)
+        except BaseException:
+            for fut in pending:
+                fut.cancel()
+            raise
+        finally:
+            bar.close()
+    return result
+
+
+@dataclass
+class AppPipeline:
+    """
+    first: first-stage batch; its finish runs once all its tasks are back.
+    then(result): second-stage task for one first-stage result (called on the
+        scheduling thread); None runs the first stage only.
+    finish: second-stage finish, given the second-stage results in completion order.
+    """
+    first: AppBatch
+    then: Optional[Callable[[Any], Callable[[], Any]]]
+    finish: Optional[Callable[[List[Any]], Any]] = None
+
+
+def run_app_pipelines(
+    app_dirs: Iterable[str],
+    plan: Callable[[str], Optional[AppPipeline]],
+    concurrency: Tuple[int, int],
+    desc: str = "chains",
+) -> Tuple[ScheduleResult, ScheduleResult]:
+    """
+    Like run_app_batches, with a pool per stage. A failing first-stage task or
+    finish fails the app in both stages (the second stage never sees a partial
+    first stage); a failing second-stage task fails only the second stage.
+    """
+    first_result, second_result = ScheduleResult(), ScheduleResult()
+    pending: Dict[Future, tuple] = {}  # future -> (stage, app_dir, idx)
+    pipes: Dict[str, AppPipeline] = {}
+    slots: Dict[Tuple[int, str], List[Any]] = {}
+    remaining: Dict[Tuple[int, str], int] = {}
+    bar = tqdm(total=0, desc=desc, ncols=90)
+
+    def fail(stage: int, app_dir: str, exc: BaseException) -> None:
+        stages = (1, 2) if stage == 1 else (2,)
+        for s in stages:
+            res = first_result if s == 1 else second_result
+            if app_dir in res.done or app_dir in res.failed:
+                continue
+            if s == 2 and pipes.get(app_dir) is not None and pipes[app_dir].then is None:
+                continue
+            res.failed[app_dir] = exc
+            remaining.pop((s, app_dir), None)
+            slots.pop((s, app_dir), None)
+        for fut, (s, owner, _) in list(pending.items()):
+            if owner == app_dir and s in stages and fut.cancel():
+                pending.pop(fut)
+        print(f"[ChainScheduler][WARN] app failed stage={stage} app={app_dir} err={exc}")
+
+    def finish(stage: int, app_dir: str) -> None:
+        pipe = pipes[app_dir]
+        res = first_result if stage == 1 else second_result
+        fn = pipe.first.finish if stage == 1 else pipe.finish
+        remaining.pop((stage, app_dir), None)
+        try:
+            res.done[app_dir] = fn(slots.pop((stage, app_dir)))
+        except Exception as exc:
+            fail(stage, app_dir, exc)
+
+    def submit(stage: int, executor: ThreadPoolExecutor, app_dir: str, idx: int, task: Callable[[], Any]) -> None:
+        pending[executor.submit(task)] = (stage, app_dir, idx)
+
+    def collect(done: Set[Future], second_pool: ThreadPoolExecutor) -> None:
+        for fut in done:
+            if fut not in pending:
+                continue
+            stage, app_dir, idx = pending.pop(fut)
+            bar.update(1)
+            if (stage, app_dir) not in remaining:
+                continue
+            exc = fut.exception()
+            if exc is not None:
+                fail(stage, app_dir, exc)
+                continue
+            value = fut.result()
+            pipe = pipes[app_dir]
+            if stage == 1:
+                slots[(1, app_dir)][idx] = value
+                # Once stage 2 has failed for this app, stop feeding it.
+                if pipe.then is not None and (2, app_dir) in remaining:
+                    try:
+                        submit(2, second_pool, app_dir, idx, pipe.then(value))
+                    except Exception as exc:
+                        fail(2, app_dir, exc)
+            else:
+                slots[(2, app_dir)].append(value)
+            remaining[(stage, app_dir)] -= 1
+            if remaining[(stage, app_dir)] == 0:
+                # Stage 2 tasks only exist once their stage 1 result is back,
+                # so an app's second finish always follows its first.
+                finish(stage, app_dir)
+
+    first_n, second_n = concurrency
+    with ThreadPoolExecutor(max_workers=max(1, first_n), thread_name_prefix="chain-sched-1") as first_pool, \
+            ThreadPoolExecutor(max_workers=max(1, second_n), thread_name_prefix="chain-sched-2") as second_pool:
+        try:
+            for app_dir in app_dirs:
+                try:
+                    pipe = plan(app_dir)
+                except Exception as exc:
+                    first_result.failed[app_dir] = second_result.failed[app_dir] = exc
+                    print(f"[ChainScheduler][WARN] app failed stage=1 app={app_dir} err={exc}")
+                    continue
+                if pipe is None:
+                    first_result.done[app_dir] = None
+                    continue
+                pipes[app_dir] = pipe
+                n = len(pipe.first.tasks)
+                slots[(1, app_dir)] = [None] * n
+                remaining[(1, app_dir)] = n
+                if pipe.then is not None:
+                    slots[(2, app_dir)] = []
+                    remaining[(2, app_dir)] = n
+                bar.total += n * (2 if pipe.then is not None else 1)
+                bar.refresh()
+                if not n:
+                    finish(1, app_dir)
+                    if pipe.then is not None and app_dir in first_result.done:
+                        finish(2, app_dir)
+                    continue
+                for idx, task in enumerate(pipe.first.tasks):
+                    submit(1, first_pool, app_dir, idx, task)
+                collect({fut for fut in pending if fut.done()}, second_pool)
+
+            while pending:
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                collect(done, second_pool)
+        except BaseException:
+            for fut in pending:
+                fut.cancel()
+            raise
+        finally:
+            bar.close()
+    return first_result, second_result
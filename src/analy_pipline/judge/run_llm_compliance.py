@@ -3,11 +3,12 @@
 
 from __future__ import annotations
 
+import functools
 import json
 import os
 import re
 import sys
-from typing import Any, Dict, List, Optional, Set, Tuple
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 from tqdm import tqdm
 
@@ -15,6 +16,7 @@ ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
 if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
 
+from analy_pipline.common.chain_scheduler import AppBatch  # noqa: E402
 from analy_pipline.common.chain_summary import load_chain_summary_map  # noqa: E402
 from analy_pipline.judge.knowledge_retriever import (  # noqa: E402
     load_structured_knowledge_entries,
@@ -343,7 +345,166 @@ def _iter_app_dirs(processed_dir: str) -> List[str]:
     return out
 
 
-def process_app_dir_v2(
+def _chain_review_input(
+    chain_id: int,
+    sem: Dict[str, Any],
+    permissions: List[Any],
+    summary_obj: Dict[str, Any],
+    structured_knowledge_entries: List[Dict[str, Any]],
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Retrieval record and LLM payload for one chain (local work, no LLM call)."""
+    widgets = _dedupe_text_list(summary_obj.get("top_widgets"), max_items=14, max_len=80)
+    before_text = _as_text(summary_obj.get("before_text"), 320)
+    granting_text = _as_text(summary_obj.get("granting_text"), 320)
+    after_text = _as_text(summary_obj.get("after_text"), 320)
+
+    ui_scene = _sem_ui_scene(sem)
+    refined_scene = _sem_refined_scene(sem)
+    page_description = _as_text(sem.get("page_description"), 800)
+    page_function = _as_text(sem.get("page_function"), 240)
+    user_goal = _as_text(sem.get("user_goal"), 240)
+
+    retrieved_knowledge = retrieve_scene_conditioned_knowledge(
+        prior_entries=[],
+        pattern_entries=[],
+        case_entries=[],
+        skill_entries=[],
+        structured_entries=structured_knowledge_entries,
+        refined_scene=refined_scene,
+        ui_task_scene=ui_scene,
+        permissions=permissions,
+        user_intent=user_goal,
+        trigger_action=page_function,
+        page_observation=page_description,
+        visual_evidence=widgets,
+        structured_cues=None,
+        top_k_patterns=2,
+        top_k_cases=4,
+        top_k_risky_cases=2,
+        top_k_compliant_cases=2,
+        top_k_skills=2,
+    )
+
+    retrieval_record = {
+        "chain_id": chain_id,
+        "ui_task_scene": ui_scene,
+        "refined_scene": refined_scene,
+        "permissions": permissions,
+        "retrieved_knowledge": retrieved_knowledge,
+    }
+
+    payload = {
+        "chain_id": chain_id,
+        "semantic": {
+            "page_description": page_description,
+            "page_function": page_function,
+            "user_goal": user_goal,
+            "scene": {
+                "ui_task_scene": ui_scene,
+                "refined_scene": refined_scene,
+                "confidence": _sem_confidence(sem),
+            },
+        },
+        "permissions": permissions,
+        "retrieved_knowledge": retrieved_knowledge,
+        "ocr_widgets": {
+            "before_text": before_text,
+            "granting_text": granting_text,
+            "after_text": after_text,
+            "widgets": widgets,
+        },
+    }
+    return retrieval_record, payload
+
+
+def _review_chain(
+    chain_id: int,
+    sem: Dict[str, Any],
+    permissions: List[Any],
+    payload: Dict[str, Any],
+    prompt_template: str,
+    vllm_url: str,
+    model: str,
+) -> Tuple[Dict[str, Any], bool]:
+    one_pass, ok, raw_output, fail_reason = _run_one_pass(
+        payload=payload,
+        prompt_template=prompt_template,
+        vllm_url=vllm_url,
+        model=model,
+    )
+    record = _build_record(
+        chain_id=chain_id,
+        sem=sem,
+        permissions=permissions,
+        one_pass=one_pass,
+        ok=ok,
+        raw_output=raw_output,
+        fail_reason=fail_reason,
+    )
+    return record, ok
+
+
+def app_reviewer(
+    app_dir: str,
+    vllm_url: str,
+    model: str,
+    prompt_template: str,
+    structured_knowledge_entries: List[Dict[str, Any]],
+    retrieval_output_filename: str = RETRIEVAL_FILENAME,
+) -> Tuple[Callable, Callable]:
+    """
+    (prepare, finish) for one app. prepare(chain_id, sem) runs retrieval and
+    returns the chain's LLM task; finish(results) writes both output files in
+    chain_id order, whatever order the chains were prepared in, and returns
+    (reviewed, invalid).
+    """
+    result_json_path = os.path.join(app_dir, "result.json")
+    permissions_map = _load_permissions_map(app_dir)
+    summary_map = load_chain_summary_map(result_json_path, permissions_map=permissions_map)
+    retrieval_outputs: Dict[int, Dict[str, Any]] = {}
+
+    def prepare(chain_id: int, sem: Dict[str, Any]) -> Callable[[], Tuple[Dict[str, Any], bool]]:
+        sem = _as_dict(sem)
+        permissions = _as_list(permissions_map.get(chain_id))
+        summary_obj = _as_dict(_as_dict(summary_map.get(chain_id)).get("chain_summary"))
+        retrieval_record, payload = _chain_review_input(
+            chain_id, sem, permissions, summary_obj, structured_knowledge_entries
+        )
+        retrieval_outputs[chain_id] = retrieval_record
+        return functools.partial(
+            _review_chain,
+            chain_id,
+            sem,
+            permissions,
+            payload,
+            prompt_template=prompt_template,
+            vllm_url=vllm_url,
+            model=model,
+        )
+
+    def finish(results: List[Tuple[Dict[str, Any], bool]]) -> Tuple[int, int]:
+        results = sorted(results, key=lambda r: int(r[0].get("chain_id", -1)))
+        outputs = [record for record, _ in results]
+        invalid = sum(1 for _, ok in results if not ok)
+
+        out_path = os.path.join(app_dir, OUTPUT_FILENAME)
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump(outputs, f, ensure_ascii=False, indent=2)
+
+        retrieval_path = os.path.join(app_dir, retrieval_output_filename)
+        with open(retrieval_path, "w", encoding="utf-8") as f:
+            json.dump([retrieval_outputs[cid] for cid in sorted(retrieval_outputs)], f, ensure_ascii=False, indent=2)
+
+        print(
+            f"[LLM-Review-V2] finish app={app_dir} reviewed={len(outputs)} "
+            f"invalid={invalid} out={out_path} retrieval={retrieval_path}"
+        )
+        return len(outputs), invalid
+
+    return prepare, finish
+
+
+def plan_app_dir_v2(
     app_dir: str,
     vllm_url: str,
     model: str,
@@ -352,130 +513,106 @@ def process_app_dir_v2(
     semantic_filename: str = SEMANTIC_V2_FILENAME,
     retrieval_output_filename: str = RETRIEVAL_FILENAME,
     chain_ids_filter: Optional[Set[int]] = None,
-) -> Tuple[int, int]:
+) -> Optional[AppBatch]:
+    """
+    Retrieval for every chain runs here; the batch holds one text LLM task per
+    chain and its finish writes both output files and returns (reviewed, invalid).
+    None when the app has no result.json / semantic file.
+    """
     result_json_path = os.path.join(app_dir, "result.json")
     if not os.path.exists(result_json_path):
         print(f"[LLM-Review-V2] skip app={app_dir} missing result.json")
-        return 0, 0
+        return None
 
     sem_map = _load_semantics_map(app_dir, filename=semantic_filename)
     if not sem_map:
         print(f"[LLM-Review-V2] skip app={app_dir} missing semantic file={semantic_filename}")
-        return 0, 0
-
-    permissions_map = _load_permissions_map(app_dir)
-    summary_map = load_chain_summary_map(result_json_path, permissions_map=permissions_map)
-
-    outputs: List[Dict[str, Any]] = []
-    retrieval_outputs: List[Dict[str, Any]] = []
-    invalid = 0
+        return None
 
-    for chain_id in sorted(sem_map.keys()):
-        if chain_ids_filter is not None and chain_id not in chain_ids_filter:
-            continue
-
-        sem = _as_dict(sem_map.get(chain_id))
-        permissions = _as_list(permissions_map.get(chain_id))
-
-        summary_obj = _as_dict(_as_dict(summary_map.get(chain_id)).get("chain_summary"))
-        widgets = _dedupe_text_list(summary_obj.get("top_widgets"), max_items=14, max_len=80)
-        before_text = _as_text(summary_obj.get("before_text"), 320)
-        granting_text = _as_text(summary_obj.get("granting_text"), 320)
-        after_text = _as_text(summary_obj.get("after_text"), 320)
-
-        ui_scene = _sem_ui_scene(sem)
-        refined_scene = _sem_refined_scene(sem)
-        page_description = _as_text(sem.get("page_description"), 800)
-        page_function = _as_text(sem.get("page_function"), 240)
-        user_goal = _as_text(sem.get("user_goal"), 240)
-
-        retrieved_knowledge = retrieve_scene_conditioned_knowledge(
-            prior_entries=[],
-            pattern_entries=[],
-            case_entries=[],
-            skill_entries=[],
-            structured_entries=structured_knowledge_entries,
-            refined_scene=refined_scene,
-            ui_task_scene=ui_scene,
-            permissions=permissions,
-            user_intent=user_goal,
-            trigger_action=page_function,
-            page_observation=page_description,
-            visual_evidence=widgets,
-            structured_cues=None,
-            top_k_patterns=2,
-            top_k_cases=4,
-            top_k_risky_cases=2,
-            top_k_compliant_cases=2,
-            top_k_skills=2,
-        )
+    prepare, finish = app_reviewer(
+        app_dir,
+        vllm_url=vllm_url,
+        model=model,
+        prompt_template=prompt_template,
+        structured_knowledge_entries=structured_knowledge_entries,
+        retrieval_output_filename=retrieval_output_filename,
+    )
+    tasks = [
+        prepare(chain_id, sem_map[chain_id])
+        for chain_id in sorted(sem_map.keys())
+        if chain_ids_filter is None or chain_id in chain_ids_filter
+    ]
+    return AppBatch(app_dir=app_dir, tasks=tasks, finish=finish)
 
-        retrieval_outputs.append(
-            {
-                "chain_id": chain_id,
-                "ui_task_scene": ui_scene,
-                "refined_scene": refined_scene,
-                "permissions": permissions,
-                "retrieved_knowledge": retrieved_knowledge,
-            }
-        )
 
-        payload = {
-            "chain_id": chain_id,
-            "semantic": {
-                "page_description": page_description,
-                "page_function": page_function,
-                "user_goal": user_goal,
-                "scene": {
-                    "ui_task_scene": ui_scene,
-                    "refined_scene": refined_scene,
-                    "confidence": _sem_confidence(sem),
-                },
-            },
-            "permissions": permissions,
-            "retrieved_knowledge": retrieved_knowledge,
-            "ocr_widgets": {
-                "before_text": before_text,
-                "granting_text": granting_text,
-                "after_text": after_text,
-                "widgets": widgets,
-            },
-        }
+def process_app_dir_v2(
+    app_dir: str,
+    vllm_url: str,
+    model: str,
+    prompt_template: str,
+    structured_knowledge_entries: List[Dict[str, Any]],
+    semantic_filename: str = SEMANTIC_V2_FILENAME,
+    retrieval_output_filename: str = RETRIEVAL_FILENAME,
+    chain_ids_filter: Optional[Set[int]] = None,
+    concurrency: int = 1,
+) -> Tuple[int, int]:
+    """
+    Retrieval runs chain by chain in this thread; with concurrency > 1 the
+    text LLM calls are then issued from a pool of that many threads. Both
+    output files keep sorted chain order.
+    """
+    batch = plan_app_dir_v2(
+        app_dir,
+        vllm_url=vllm_url,
+        model=model,
+        prompt_template=prompt_template,
+        structured_knowledge_entries=structured_knowledge_entries,
+        semantic_filename=semantic_filename,
+        retrieval_output_filename=retrieval_output_filename,
+        chain_ids_filter=chain_ids_filter,
+    )
+    if batch is None:
+        return 0, 0
+    return batch.run(concurrency)
 
-        one_pass, ok, raw_output, fail_reason = _run_one_pass(
-            payload=payload,
-            prompt_template=prompt_template,
-            vllm_url=vllm_url,
-            model=model,
-        )
-        if not ok:
-            invalid += 1
-
-        outputs.append(
-            _build_record(
-                chain_id=chain_id,
-                sem=sem,
-                permissions=permissions,
-                one_pass=one_pass,
-                ok=ok,
-                raw_output=raw_output,
-                fail_reason=fail_reason,
-            )
-        )
 
-    out_path = os.path.join(app_dir, OUTPUT_FILENAME)
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(outputs, f, ensure_ascii=False, indent=2)
+def app_planner(
+    prompt_dir: str,
+    vllm_url: str,
+    model: str,
+    chain_ids: Optional[List[int]] = None,
+    semantic_filename: str = SEMANTIC_V2_FILENAME,
+    retrieval_output_filename: str = RETRIEVAL_FILENAME,
+) -> Callable[[str], Optional[AppBatch]]:
+    """plan_app_dir_v2 with prompt and knowledge loaded once, for the global chain scheduler."""
+    chain_filter = {int(x) for x in chain_ids} if chain_ids else None
+    return functools.partial(
+        plan_app_dir_v2,
+        vllm_url=vllm_url,
+        model=model,
+        prompt_template=_load_prompt_template(prompt_dir),
+        structured_knowledge_entries=load_structured_knowledge_entries(SCENE_STRUCTURED_KNOWLEDGE_FILE),
+        semantic_filename=semantic_filename,
+        retrieval_output_filename=retrieval_output_filename,
+        chain_ids_filter=chain_filter,
+    )
 
-    retrieval_path = os.path.join(app_dir, retrieval_output_filename)
-    with open(retrieval_path, "w", encoding="utf-8") as f:
-        json.dump(retrieval_outputs, f, ensure_ascii=False, indent=2)
 
-    print(
-        f"[LLM-Review-V2] finish app={app_dir} reviewed={len(outputs)} "
-        f"invalid={invalid} out={out_path} retrieval={retrieval_path}"
+def app_reviewer_factory(
+    prompt_dir: str,
+    vllm_url: str,
+    model: str,
+    retrieval_output_filename: str = RETRIEVAL_FILENAME,
+) -> Callable[[str], Tuple[Callable, Callable]]:
+    """app_reviewer with prompt and knowledge loaded once, for the pipelined scheduler."""
+    return functools.partial(
+        app_reviewer,
+        vllm_url=vllm_url,
+        model=model,
+        prompt_template=_load_prompt_template(prompt_dir),
+        structured_knowledge_entries=load_structured_knowledge_entries(SCENE_STRUCTURED_KNOWLEDGE_FILE),
+        retrieval_output_filename=retrieval_output_filename,
     )
-    return len(outputs), invalid
 
 
 def run_v2(
@@ -486,7 +623,10 @@ def run_v2(
     chain_ids: Optional[List[int]] = None,
     semantic_filename: str = SEMANTIC_V2_FILENAME,
     retrieval_output_filename: str = RETRIEVAL_FILENAME,
+    concurrency: Optional[int] = None,
 ) -> None:
+    if concurrency is None:
+        concurrency = settings.COMPLIANCE_CONCURRENCY
     prompt_template = _load_prompt_template(prompt_dir)
     structured_knowledge_entries = load_structured_knowledge_entries(SCENE_STRUCTURED_KNOWLEDGE_FILE)
 
@@ -508,6 +648,7 @@ def run_v2(
             semantic_filename=semantic_filename,
             retrieval_output_filename=retrieval_output_filename,
             chain_ids_filter=chain_filter,
+            concurrency=concurrency,
         )
         total += c
         invalid += i
@@ -546,6 +687,7 @@ if __name__ == "__main__":
     parser.add_argument("--chain-ids", default="", help="comma-separated chain ids")
     parser.add_argument("--semantic-filename", default=SEMANTIC_V2_FILENAME)
     parser.add_argument("--retrieval-output-filename", default=RETRIEVAL_FILENAME)
+    parser.add_argument("--concurrency", type=int, default=settings.COMPLIANCE_CONCURRENCY, help="text LLM requests in flight per app")
     args = parser.parse_args()
 
     ids: Optional[List[int]] = None
@@ -568,4 +710,5 @@ if __name__ == "__main__":
         chain_ids=ids,
         semantic_filename=args.semantic_filename,
         retrieval_output_filename=args.retrieval_output_filename,
+        concurrency=args.concurrency,
     )
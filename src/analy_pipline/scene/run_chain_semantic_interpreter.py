@@ -21,23 +21,25 @@ from __future__ import annotations
 
 import argparse
 import base64
+import functools
 import json
 import os
 import re
 import sys
 from collections import Counter
-from typing import Any, Dict, List, Optional, Set, Tuple
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 import requests
-from tqdm import tqdm
 
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
 if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
 
+from analy_pipline.common.chain_scheduler import AppBatch  # noqa: E402
 from analy_pipline.common.chain_summary import load_chain_summary_map  # noqa: E402
 from configs import settings  # noqa: E402
 from configs.domain.scene_config import SCENE_LIST  # noqa: E402
+from data_pipline.chain_render import ChainRenderer, chain_image_name  # noqa: E402
 from utils.http_retry import post_json_with_retry  # noqa: E402
 from utils.validators import validate_result_json_chains  # noqa: E402
 
@@ -597,18 +599,16 @@ def _load_permission_map(app_dir: str) -> Dict[int, List[str]]:
     return out
 
 
-def process_app(
+def plan_app(
     app_dir: str,
     prompt_template: str,
     vllm_url: str,
     model: str,
     output_filename: str = OUTPUT_FILENAME,
-    schema_version: str = "v2",
     single_pass_only: bool = False,
     chain_filter: Optional[Set[int]] = None,
-) -> Tuple[List[Dict[str, Any]], int]:
-    del schema_version  # kept for main.py compatibility
-
+) -> AppBatch:
+    """One VLM task per chain; finish writes the app output and returns (records, low_conf)."""
     result_json_path = os.path.join(app_dir, "result.json")
     with open(result_json_path, "r", encoding="utf-8") as f:
         chains = validate_result_json_chains(json.load(f))
@@ -616,15 +616,21 @@ def process_app(
     permission_map = _load_permission_map(app_dir)
     summary_map = load_chain_summary_map(result_json_path, permissions_map=permission_map)
 
-    out: List[Dict[str, Any]] = []
-    low_conf = 0
-
-    for idx, chain in enumerate(tqdm(chains, desc=f"ChainSemantic {os.path.basename(app_dir)}", ncols=90)):
+    renderer = ChainRenderer(app_dir)
+    jobs: List[Tuple[int, Dict[str, Any]]] = []
+    for idx, chain in enumerate(chains):
         chain_id = int(chain.get("chain_id", idx))
         if chain_filter is not None and chain_id not in chain_filter:
             continue
+        jobs.append((chain_id, chain))
 
-        image_path = os.path.join(app_dir, f"chain_{chain_id}.png")
+    def run_chain(chain_id: int, chain: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            image_path = renderer.ensure(chain_id)
+        except Exception as exc:
+            # Same as a missing chain_*.png in eager mode: the chain goes on without its image.
+            print(f"[ChainSemantic][WARN] chain_id={chain_id} render_failed: {exc}")
+            image_path = os.path.join(app_dir, chain_image_name(chain_id))
         chain_summary_obj = summary_map.get(chain_id, {"chain_summary": {}}).get("chain_summary", {})
         if not isinstance(chain_summary_obj, dict):
             chain_summary_obj = {}
@@ -639,7 +645,7 @@ def process_app(
             image_path=image_path,
             permissions_hint=permissions_hint,
         )
-        rec = infer_chain_semantics(
+        return infer_chain_semantics(
             chain_id,
             image_path,
             input_payload,
@@ -649,20 +655,48 @@ def process_app(
             single_pass_only=single_pass_only,
         )
 
-        conf = float(rec.get("scene", {}).get("confidence", 0.35))
-        if conf < 0.5:
-            low_conf += 1
+    def finish(out: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+        low_conf = sum(1 for rec in out if float(rec.get("scene", {}).get("confidence", 0.35)) < 0.5)
+        out = sorted(out, key=lambda x: int(x.get("chain_id", -1)))
 
-        out.append(rec)
+        out_path = os.path.join(app_dir, output_filename)
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump(out, f, ensure_ascii=False, indent=2)
 
-    out.sort(key=lambda x: int(x.get("chain_id", -1)))
+        print(f"[ChainSemantic] finish app={app_dir} chains={len(out)} low_conf={low_conf} out={out_path}")
+        return out, low_conf
 
-    out_path = os.path.join(app_dir, output_filename)
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(out, f, ensure_ascii=False, indent=2)
+    tasks = [functools.partial(run_chain, chain_id, chain) for chain_id, chain in jobs]
+    return AppBatch(app_dir=app_dir, tasks=tasks, finish=finish)
 
-    print(f"[ChainSemantic] finish app={app_dir} chains={len(out)} low_conf={low_conf} out={out_path}")
-    return out, low_conf
+
+def process_app(
+    app_dir: str,
+    prompt_template: str,
+    vllm_url: str,
+    model: str,
+    output_filename: str = OUTPUT_FILENAME,
+    schema_version: str = "v2",
+    single_pass_only: bool = False,
+    chain_filter: Optional[Set[int]] = None,
+    concurrency: int = 1,
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    concurrency: chains whose VLM requests are kept in flight at once, so the
+    server can batch them. Records come back in chain order either way.
+    """
+    del schema_version  # kept for main.py compatibility
+
+    batch = plan_app(
+        app_dir,
+        prompt_template,
+        vllm_url,
+        model,
+        output_filename=output_filename,
+        single_pass_only=single_pass_only,
+        chain_filter=chain_filter,
+    )
+    return batch.run(concurrency, desc=f"ChainSemantic {os.path.basename(app_dir)}")
 
 
 def _parse_chain_ids(chain_ids: Optional[List[int]]) -> Optional[Set[int]]:
@@ -719,6 +753,43 @@ def build_summary(records: List[Dict[str, Any]], apps_processed: int, low_conf_c
     }
 
 
+def app_planner(
+    prompt_file: str,
+    vllm_url: str,
+    model: str,
+    output_filename: str = OUTPUT_FILENAME,
+    single_pass_only: bool = False,
+    chain_ids: Optional[List[int]] = None,
+) -> Callable[[str], AppBatch]:
+    """plan_app with the prompt loaded once, for the global chain scheduler."""
+    return functools.partial(
+        plan_app,
+        prompt_template=load_prompt_template(prompt_file),
+        vllm_url=vllm_url,
+        model=model,
+        output_filename=output_filename,
+        single_pass_only=single_pass_only,
+        chain_filter=_parse_chain_ids(chain_ids),
+    )
+
+
+def write_summary(
+    target: str,
+    records: List[Dict[str, Any]],
+    apps_processed: int,
+    low_conf_count: int,
+    summary_filename: str = SUMMARY_FILENAME,
+) -> str:
+    summary = build_summary(records, apps_processed=apps_processed, low_conf_count=low_conf_count)
+    summary_dir = target if not os.path.exists(os.path.join(target, "result.json")) else os.path.dirname(target)
+    summary_path = os.path.join(summary_dir, summary_filename)
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+
+    print(f"[ChainSemantic] done apps={apps_processed} total_chains={len(records)} summary={summary_path}")
+    return summary_path
+
+
 def run(
     target: str,
     prompt_file: str,
@@ -729,7 +800,10 @@ def run(
     schema_version: str = "v2",
     single_pass_only: bool = False,
     chain_ids: Optional[List[int]] = None,
+    concurrency: Optional[int] = None,
 ) -> None:
+    if concurrency is None:
+        concurrency = settings.SEMANTIC_CONCURRENCY
     prompt_template = load_prompt_template(prompt_file)
     app_dirs = iter_app_dirs(target)
     chain_filter = _parse_chain_ids(chain_ids)
@@ -748,19 +822,14 @@ def run(
                 schema_version=schema_version,
                 single_pass_only=single_pass_only,
                 chain_filter=chain_filter,
+                concurrency=concurrency,
             )
             all_records.extend(records)
             low_conf_total += low_conf
         except Exception as exc:
             print(f"[ChainSemantic][WARN] app failed app={app_dir} err={exc}")
 
-    summary = build_summary(all_records, apps_processed=len(app_dirs), low_conf_count=low_conf_total)
-    summary_dir = target if not os.path.exists(os.path.join(target, "result.json")) else os.path.dirname(target)
-    summary_path = os.path.join(summary_dir, summary_filename)
-    with open(summary_path, "w", encoding="utf-8") as f:
-        json.dump(summary, f, ensure_ascii=False, indent=2)
-
-    print(f"[ChainSemantic] done apps={len(app_dirs)} total_chains={len(all_records)} summary={summary_path}")
+    write_summary(target, all_records, len(app_dirs), low_conf_total, summary_filename=summary_filename)
 
 
 if __name__ == "__main__":
@@ -774,6 +843,7 @@ if __name__ == "__main__":
     parser.add_argument("--schema-version", choices=["v1", "v2"], default="v2")
     parser.add_argument("--single-pass-only", action="store_true", help="disable rerun; exactly one VLM call per chain")
     parser.add_argument("--chain-ids", default="", help="comma-separated chain ids, e.g. 1,3,9")
+    parser.add_argument("--concurrency", type=int, default=settings.SEMANTIC_CONCURRENCY, help="VLM requests in flight per app")
     args = parser.parse_args()
 
     chain_ids: List[int] = []
@@ -797,4 +867,5 @@ if __name__ == "__main__":
         schema_version=args.schema_version,
         single_pass_only=args.single_pass_only,
         chain_ids=chain_ids or None,
+        concurrency=args.concurrency,
     )
@@ -126,10 +126,62 @@ FASTBOT_TIMEOUT_BUFFER_SECONDS = _env_int(
     ["LLMMUI_FASTBOT_TIMEOUT_BUFFER_SECONDS", "FASTBOT_TIMEOUT_BUFFER_SECONDS"],
     300,
 )
+# fixed: run fastbot for TIME_LIMIT minutes; adaptive: TIME_LIMIT is the maximum,
+# stop once no new permission tuple appeared for FASTBOT_PLATEAU_SECONDS
+FASTBOT_BUDGET = _env_first(["LLMMUI_FASTBOT_BUDGET", "FASTBOT_BUDGET"], "fixed")
+FASTBOT_MIN_MINUTES = _env_int(["LLMMUI_FASTBOT_MIN_MINUTES", "FASTBOT_MIN_MINUTES"], 3)
+FASTBOT_PLATEAU_SECONDS = _env_int(["LLMMUI_FASTBOT_PLATEAU_SECONDS", "FASTBOT_PLATEAU_SECONDS"], 180)
+FASTBOT_POLL_SECONDS = _env_int(["LLMMUI_FASTBOT_POLL_SECONDS", "FASTBOT_POLL_SECONDS"], 30)
 ADB_PULL_TIMEOUT_SECONDS = _env_int(
     ["LLMMUI_ADB_PULL_TIMEOUT_SECONDS", "ADB_PULL_TIMEOUT_SECONDS"],
     300,
 )
+# adb executable (may include arguments, e.g. "python3 scripts/test/fake_adb.py")
+ADB_BIN = _env_first(["LLMMUI_ADB_BIN", "ADB_BIN"], "adb")
+# "" -> adb default device, "all" -> every attached device, or comma-separated serials
+PHASE1_DEVICES = _env_first(["LLMMUI_PHASE1_DEVICES", "PHASE1_DEVICES"], "")
+# dir: adb pull per file; tar / tgz: one (gzip'd) tar stream via adb exec-out
+PHASE1_PULL_MODE = _env_first(["LLMMUI_PHASE1_PULL_MODE", "PHASE1_PULL_MODE"], "dir")
+# Pull only the steps phase2 can use (tuple span +/- repair window)
+PHASE1_PULL_SELECTIVE = _env_int(["LLMMUI_PHASE1_PULL_SELECTIVE", "PHASE1_PULL_SELECTIVE"], 0) == 1
+# full mode: hand each app to phase2/phase3_v2 as soon as phase1 pulls it
+FULL_STREAM = _env_int(["LLMMUI_FULL_STREAM", "FULL_STREAM"], 0) == 1
+
+# =========================
+# Phase2 runtime
+# =========================
+PHASE2_WORKERS = _env_int(["LLMMUI_PHASE2_WORKERS", "PHASE2_WORKERS"], 1)
+# multiscale: legacy 1.0/1.5/2.0 concatenation; adaptive: escalate only on low confidence
+PHASE2_OCR_MODE = _env_first(["LLMMUI_PHASE2_OCR_MODE", "PHASE2_OCR_MODE"], "multiscale")
+PHASE2_OCR_MIN_CONF = _env_int(["LLMMUI_PHASE2_OCR_MIN_CONF", "PHASE2_OCR_MIN_CONF"], 60)
+PHASE2_OCR_MIN_CHARS = _env_int(["LLMMUI_PHASE2_OCR_MIN_CHARS", "PHASE2_OCR_MIN_CHARS"], 8)
+PHASE2_OCR_BACKEND = _env_first(["LLMMUI_PHASE2_OCR_BACKEND", "PHASE2_OCR_BACKEND"], "pytesseract")
+PHASE2_OCR_BATCH_SIZE = _env_int(["LLMMUI_PHASE2_OCR_BATCH_SIZE", "PHASE2_OCR_BATCH_SIZE"], 32)
+PHASE2_OCR_ROI = _env_int(["LLMMUI_PHASE2_OCR_ROI", "PHASE2_OCR_ROI"], 0) == 1
+# always: OCR every step; widget_first: skip OCR when XML widget text covers the screen
+PHASE2_OCR_POLICY = _env_first(["LLMMUI_PHASE2_OCR_POLICY", "PHASE2_OCR_POLICY"], "always")
+PHASE2_WIDGET_TEXT_MIN_COVERAGE = float(
+    _env_first(["LLMMUI_PHASE2_WIDGET_TEXT_MIN_COVERAGE", "PHASE2_WIDGET_TEXT_MIN_COVERAGE"], "0.6")
+)
+# chains: legacy result.json; screens: each screen stored once per app, chains reference it by file
+PHASE2_RESULT_FORMAT = _env_first(["LLMMUI_PHASE2_RESULT_FORMAT", "PHASE2_RESULT_FORMAT"], "chains")
+# Widget retention in result.json: 0 keeps all; K keeps text widgets among the top-K texts
+# or scoring >= floor. K must cover chain_summary top widgets, floor WIDGET_SCORE_THRESHOLD.
+PHASE2_WIDGET_TOP_K = _env_int(["LLMMUI_PHASE2_WIDGET_TOP_K", "PHASE2_WIDGET_TOP_K"], 0)
+PHASE2_WIDGET_SCORE_FLOOR = float(
+    _env_first(["LLMMUI_PHASE2_WIDGET_SCORE_FLOOR", "PHASE2_WIDGET_SCORE_FLOOR"], "10.0")
+)
+# Near-duplicate steps (same XML widgets, dHash within N bits) share OCR text and decoded images
+PHASE2_DEDUPE = _env_int(["LLMMUI_PHASE2_DEDUPE", "PHASE2_DEDUPE"], 0) == 1
+PHASE2_DEDUPE_MAX_DISTANCE = _env_int(["LLMMUI_PHASE2_DEDUPE_MAX_DISTANCE", "PHASE2_DEDUPE_MAX_DISTANCE"], 4)
+# Parsed UIAutomator XML kept per app (LRU entries, cleared between apps)
+PHASE2_WIDGET_CACHE_SIZE = _env_int(["LLMMUI_PHASE2_WIDGET_CACHE_SIZE", "PHASE2_WIDGET_CACHE_SIZE"], 2048)
+# eager: phase2 writes every chain_{i}.png; lazy: rendered on first use by data_pipline.chain_render
+PHASE2_CHAIN_IMAGES = _env_first(["LLMMUI_PHASE2_CHAIN_IMAGES", "PHASE2_CHAIN_IMAGES"], "eager")
+# Optional JSONL trace with per-app stage timings ("" disables)
+PHASE2_TRACE_PATH = _env_first(["LLMMUI_PHASE2_TRACE_PATH", "PHASE2_TRACE_PATH"], "")
+# "auto" -> <processed_root>/.phase2_cache.sqlite, "off" disables the persistent cache
+PHASE2_CACHE_PATH = _env_first(["LLMMUI_PHASE2_CACHE_PATH", "PHASE2_CACHE_PATH"], "auto")
 
 # =========================
 # LLM runtime
@@ -154,3 +206,12 @@ VLLM_VL_MODEL = _resolve_vllm_model(
     VLLM_VL_URL,
 )
 LLM_RESPONSE_TIMEOUT = _env_int(["LLMMUI_LLM_RESPONSE_TIMEOUT", "LLM_RESPONSE_TIMEOUT"], 120)
+# Chains whose VLM requests the semantic stage keeps in flight per app (1 = sequential)
+SEMANTIC_CONCURRENCY = _env_int(["LLMMUI_SEMANTIC_CONCURRENCY", "SEMANTIC_CONCURRENCY"], 1)
+# Chains whose text LLM requests the compliance stage keeps in flight per app (1 = sequential)
+COMPLIANCE_CONCURRENCY = _env_int(["LLMMUI_COMPLIANCE_CONCURRENCY", "COMPLIANCE_CONCURRENCY"], 1)
+# phase3_v2 LLM stages: "app" = app by app, "global" = one chain queue across all apps,
+# "pipeline" = global, with semantic and llm requests overlapped per chain
+PHASE3_SCHEDULER = _env_first(["LLMMUI_PHASE3_SCHEDULER", "PHASE3_SCHEDULER"], "app")
+# Keep-alive connections pooled per LLM endpoint (0 = max of the two concurrencies above)
+HTTP_POOL_SIZE = _env_int(["LLMMUI_HTTP_POOL_SIZE", "HTTP_POOL_SIZE"], 0)
@@ -0,0 +1,151 @@
+"""
+On-demand rendering of phase2 chain images (chain_{i}.png).
+
+With phase2 `--chain-images lazy` only result.json / tupleOfPermissions.json
+are written; consumers that need the horizontal chain strip (VLM stage,
+labeling tools, run_vlm_direct_risk.py) call `ensure_chain_image`, which
+renders it from the raw step screenshots on first use and saves it next to
+result.json so later calls just reuse the file.
+
+Raw screenshots are found through `raw_app_dir` in phase2_manifest.json,
+falling back to <DATA_RAW_DIR>/<app name>.
+"""
+
+import json
+import os
+import re
+from functools import lru_cache
+from typing import List, Optional
+
+from PIL import Image
+
+from configs import settings
+
+FIXED_HEIGHT = 1600
+MANIFEST_FILENAME = "phase2_manifest.json"
+CHAIN_IMAGE_RE = re.compile(r"^chain_(\d+)\.png$")
+_FRAME_CACHE_SIZE = 16
+
+
+def chain_image_name(chain_id: int) -> str:
+    return f"chain_{chain_id}.png"
+
+
+def normalize_to_portrait(im: Image.Image) -> Image.Image:
+    if im.width > im.height:
+        im = im.rotate(90, expand=True)
+    return im
+
+
+def load_chain_frame(path: str) -> Image.Image:
+    """Portrait frame scaled to FIXED_HEIGHT; shared by eager (data_process) and lazy rendering."""
+    im = normalize_to_portrait(Image.open(path).convert("RGB"))
+    w, h = im.size
+    return im.resize((int(w * FIXED_HEIGHT / h), FIXED_HEIGHT))
+
+
+class ChainRenderer:
+    """Renders the chains of one processed app dir; decoded frames are cached per app."""
+
+    def __init__(self, app_dir: str, raw_app_dir: Optional[str] = None):
+        self.app_dir = app_dir
+        self.raw_app_dir = raw_app_dir or self._raw_app_dir()
+        self._chains: Optional[List[List[str]]] = None
+        self.frame = lru_cache(maxsize=_FRAME_CACHE_SIZE)(load_chain_frame)
+
+    def _raw_app_dir(self) -> str:
+        try:
+            with open(os.path.join(self.app_dir, MANIFEST_FILENAME), "r", encoding="utf-8") as f:
+                raw_app_dir = json.load(f).get("raw_app_dir") or ""
+        except Exception:
+            raw_app_dir = ""
+        if raw_app_dir and os.path.isdir(raw_app_dir):
+            return raw_app_dir
+        return os.path.join(settings.DATA_RAW_DIR, os.path.basename(os.path.normpath(self.app_dir)))
+
+    @property
+    def chains(self) -> List[List[str]]:
+        """Repaired step files per chain id, from the processed tupleOfPermissions.json."""
+        if self._chains is None:
+            try:
+                with open(os.path.join(self.app_dir, "tupleOfPermissions.json"), "r", encoding="utf-8") as f:
+                    raw = json.load(f)
+            except Exception:
+                raw = []
+            self._chains = [c for c in raw if isinstance(c, list)] if isinstance(raw, list) else []
+        return self._chains
+
+    def chain_ids(self) -> List[int]:
+        return list(range(len(self.chains)))
+
+    def render(self, chain_id: int) -> Optional[str]:
+        if not 0 <= chain_id < len(self.chains):
+            return None
+        frames = [
+            self.frame(p)
+            for p in (os.path.join(self.raw_app_dir, s) for s in self.chains[chain_id])
+            if os.path.exists(p)
+        ]
+        if not frames:
+            return None
+        canvas = Image.new("RGB", (sum(im.width for im in frames), FIXED_HEIGHT), (255, 255, 255))
+        x = 0
+        for im in frames:
+            canvas.paste(im, (x, 0))
+            x += im.width
+        out = os.path.join(self.app_dir, chain_image_name(chain_id))
+        tmp = out + ".tmp.png"
+        canvas.save(tmp)
+        os.replace(tmp, out)
+        return out
+
+    def ensure(self, chain_id: int) -> str:
+        """Path of chain_{id}.png, rendering it first if it is not on disk yet."""
+        path = os.path.join(self.app_dir, chain_image_name(chain_id))
+        if os.path.exists(path):
+            return path
+        return self.render(chain_id) or path
+
+
+def ensure_chain_image(app_dir: str, chain_id: int) -> str:
+    return ChainRenderer(app_dir).ensure(chain_id)
+
+
+def list_chain_ids(app_dir: str) -> List[int]:
+    """Chain ids of an app, whether or not their images have been rendered."""
+    ids = set(ChainRenderer(app_dir).chain_ids())
+    for name in os.listdir(app_dir):
+        m = CHAIN_IMAGE_RE.match(name)
+        if m:
+            ids.add(int(m.group(1)))
+    return sorted(ids)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Render missing chain_*.png for processed app dirs.")
+    parser.add_argument("target", help="processed root or one processed app dir")
+    args = parser.parse_args()
+
+    target = os.path.abspath(args.target)
+    if os.path.isfile(os.path.join(target, "tupleOfPermissions.json")):
+        app_dirs = [target]
+    else:
+        app_dirs = [
+            os.path.join(target, d)
+            for d in sorted(os.listdir(target))
+            if os.path.isfile(os.path.join(target, d, "tupleOfPermissions.json"))
+        ]
+
+    rendered = 0
+    for app_dir in app_dirs:
+        renderer = ChainRenderer(app_dir)
+        for cid in renderer.chain_ids():
+            if not os.path.exists(os.path.join(app_dir, chain_image_name(cid))):
+                rendered += renderer.render(cid) is not None
+    print(f"[chain_render] apps={len(app_dirs)} rendered={rendered}")
+
+
+if __name__ == "__main__":
+    main()
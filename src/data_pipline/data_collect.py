@@ -2,12 +2,19 @@ import traceback
 from apkutils2 import APK
 import time
 import os
-import concurrent.futures
-import adbutils
-import src.utils.utils as utils
-from src.utils.utils import logger
-
+import json
+import shlex
+import shutil
+import subprocess
+import sys
+import tarfile
+import threading
+import src.utils.utils as utils
+from src.utils.utils import logger
+
 from configs import settings
+from data_pipline.device_pool import adb_command, device_label
+from data_pipline.step_index import TUPLE_FILENAME, repair_window_files
 
 FASTBOT_COMMAND = (
     "CLASSPATH=/sdcard/monkeyq.jar:/sdcard/framework.jar:/sdcard/fastbot-thirdpart.jar "
@@ -15,85 +22,321 @@ FASTBOT_COMMAND = (
     "-p {package} --agent reuseq --running-minutes {time} --throttle {throttle} -v -v"
 )
 DEFAULT_THROTTLE = settings.FASTBOT_THROTTLE
-
-
+PULL_MODES = ("dir", "tar", "tgz")
+FASTBOT_BUDGETS = ("fixed", "adaptive")
+
+
+class _CountingReader:
+    """File-like wrapper counting the bytes read from an adb stream."""
+
+    def __init__(self, raw):
+        self._raw = raw
+        self.count = 0
+
+    def read(self, n=-1):
+        data = self._raw.read(n)
+        self.count += len(data)
+        return data
+
+    def drain(self):
+        # tarfile stops at the end-of-archive marker; count the zero padding too.
+        while self.read(1 << 16):
+            pass
+
+
 class DataCollectAgent:
-
-    def __init__(
-        self, apk_path=None, package=None, time=settings.TIME_LIMIT, throttle=DEFAULT_THROTTLE, output_dir=None
-    ) -> None:
-        self._adb = adbutils.AdbClient(host="127.0.0.1", port=5037)
-        self._device = self._adb.device()
-
-        self._time = time
-        self._apk_path = apk_path
-        self._throttle = throttle
-
-        if package:
-            self._package = package
-        else:
-            apk = APK(self._apk_path)
-            self._package = apk.get_manifest()["@package"]
-
+
+    def __init__(
+        self,
+        apk_path=None,
+        package=None,
+        time=settings.TIME_LIMIT,
+        throttle=DEFAULT_THROTTLE,
+        output_dir=None,
+        serial=None,
+    ) -> None:
+        # None -> adb's default device; otherwise every adb call is pinned with -s.
+        self._serial = serial
+        # Filled by _pull_result: mode, seconds, bytes over adb, files kept.
+        self.pull_stats = {}
+        # Filled by _run_GUI_test: budget, seconds, plateau sampling (adaptive).
+        self.fastbot_stats = {}
+
+        self._time = time
+        self._apk_path = apk_path
+        self._throttle = throttle
+
+        if package:
+            self._package = package
+        else:
+            apk = APK(self._apk_path)
+            self._package = apk.get_manifest()["@package"]
+
         self.fastbot_output_dir = settings.FASTBOT_OUTPUT_TEMPLATE.format(
             package=self._package,
             time=self._time,
         )
-
-        if output_dir is None:
-            self.output_dir = settings.DATA_RAW_DIR
-        else:
-            self.output_dir = output_dir
-
+
+        if output_dir is None:
+            self.output_dir = settings.DATA_RAW_DIR
+        else:
+            self.output_dir = output_dir
+
     def get_package(self):
         return self._package
 
+    def get_device(self):
+        return device_label(self._serial)
+
+    def _adb(self, *args):
+        return adb_command(self._serial, *args)
+
     def _has_usable_result(self, result_path: str) -> bool:
         if not os.path.isdir(result_path):
             return False
         tuple_path = os.path.join(result_path, "tupleOfPermissions.json")
         return os.path.exists(tuple_path)
-
+
     def _clear_res(self):
-        command = ["adb", "shell", "rm", "-rf", f"{settings.ANDROID_DATA_DIR}/{self.fastbot_output_dir}/"]
+        command = self._adb("shell", "rm", "-rf", f"{settings.ANDROID_DATA_DIR}/{self.fastbot_output_dir}/")
         utils.exec(command)
-
-    def _install_apk(self):
-        def install_task():
-            self._device.install(self._apk_path)
-
-        # install_task()
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            try:
-                executor.submit(install_task).result(timeout=180)
-            except concurrent.futures.TimeoutError:
-                logger.error(f"install apk timeout! : {self._apk_path}")
-                raise
-
+
+    def _install_apk(self):
+        try:
+            utils.exec(self._adb("install", "-r", "-t", self._apk_path), capture_result=True, timeout=180)
+        except subprocess.TimeoutExpired:
+            logger.error(f"install apk timeout! : {self._apk_path} (device={self.get_device()})")
+            raise
+
     def _uninstall_package(self):
         try:
-            self._device.uninstall(self._package)
+            utils.exec(self._adb("uninstall", self._package), capture_result=True, timeout=60)
         except Exception as exc:
             logger.debug("uninstall skipped/failed for %s: %s", self._package, exc)
-
+
     def _run_GUI_test(self):
         timeout_seconds = settings.FASTBOT_COMMAND_TIMEOUT_SECONDS
         if timeout_seconds <= 0:
             timeout_seconds = self._time * 60 + settings.FASTBOT_TIMEOUT_BUFFER_SECONDS
-        command = [
-            "adb",
+        command = self._adb(
             "shell",
             FASTBOT_COMMAND.format(package=self._package, time=self._time, throttle=self._throttle),
-        ]
-        utils.exec(command, timeout=timeout_seconds)
+        )
+        budget = settings.FASTBOT_BUDGET
+        if budget not in FASTBOT_BUDGETS:
+            raise ValueError(f"unknown fastbot budget: {budget}")
+        started = time.perf_counter()
+        self.fastbot_stats = {"budget": budget, "max_minutes": self._time}
+        if budget == "fixed":
+            utils.exec(command, timeout=timeout_seconds)
+        else:
+            self._run_GUI_test_adaptive(command, timeout_seconds)
+        self.fastbot_stats["seconds"] = round(time.perf_counter() - started, 3)
+
+    def _sample_progress(self):
+        """(permission tuples, step screenshots) currently on the device, None if unreadable."""
+        remote_dir = shlex.quote(self._remote_result_dir())
+        try:
+            out = utils.exec(
+                self._adb(
+                    "exec-out",
+                    # grep -c (no step yet) and cat (no tuple file yet) fail early in
+                    # the run; keep the exit status 0 so utils.exec does not log it.
+                    f"ls -1 {remote_dir} 2>/dev/null | grep -c '^step-.*png$' || true; "
+                    f"cat {remote_dir}/{TUPLE_FILENAME} 2>/dev/null || true",
+                ),
+                capture_result=True,
+                timeout=60,
+            ).stdout
+        except Exception as exc:
+            logger.debug("fastbot progress sample failed for %s: %s", self._package, exc)
+            return None
+        head, _, body = out.partition("\n")
+        try:
+            steps = int(head.strip() or 0)
+            tuples = json.loads(body) if body.strip() else []
+        except ValueError:
+            # Tuple file caught mid-write; try again next poll.
+            return None
+        return (len(tuples) if isinstance(tuples, list) else 0), steps
+
+    def _stop_fastbot(self):
+        try:
+            utils.exec(self._adb("shell", "pkill", "-f", "com.android.commands.monkey"), capture_result=True, timeout=30)
+        except Exception as exc:
+            logger.debug("pkill fastbot failed for %s: %s", self._package, exc)
+
+    def _run_GUI_test_adaptive(self, command, timeout_seconds):
+        """
+        Run fastbot with --running-minutes as the maximum budget, polling the
+        device every FASTBOT_POLL_SECONDS. Once FASTBOT_MIN_MINUTES have passed
+        and the tuple count has not grown for FASTBOT_PLATEAU_SECONDS, stop it.
+        """
+        min_seconds = min(settings.FASTBOT_MIN_MINUTES, self._time) * 60
+        plateau = settings.FASTBOT_PLATEAU_SECONDS
+        poll = max(1, settings.FASTBOT_POLL_SECONDS)
+        stats = self.fastbot_stats
+        stats.update(stopped_early=False, tuples=0, steps=0, samples=0)
+
+        proc = subprocess.Popen(command, stdout=sys.stdout, stderr=sys.stderr)
+        started = last_change = time.monotonic()
+        try:
+            while True:
+                try:
+                    proc.wait(timeout=poll)
+                    break
+                except subprocess.TimeoutExpired:
+                    pass
+                now = time.monotonic()
+                if now - started > timeout_seconds:
+                    raise subprocess.TimeoutExpired(command, timeout_seconds)
+                sample = self._sample_progress()
+                if sample is None:
+                    continue
+                stats["samples"] += 1
+                if sample[0] > stats["tuples"]:
+                    last_change = now
+                stats["tuples"], stats["steps"] = sample
+                if now - started >= min_seconds and now - last_change >= plateau:
+                    logger.info(
+                        "fastbot plateau for %s after %.0fs: %d tuples / %d steps, stopping",
+                        self._package,
+                        now - started,
+                        stats["tuples"],
+                        stats["steps"],
+                    )
+                    stats["stopped_early"] = True
+                    self._stop_fastbot()
+                    try:
+                        proc.wait(timeout=30)
+                    except subprocess.TimeoutExpired:
+                        proc.kill()
+                        proc.wait()
+                    return
+        except BaseException:
+            self._stop_fastbot()
+            proc.kill()
+            proc.wait()
+            raise
+        if proc.returncode != 0:
+            raise subprocess.CalledProcessError(proc.returncode, command)
+
+    def _remote_result_dir(self):
+        return settings.ANDROID_DATA_DIR + "/" + self.fastbot_output_dir
+
+    def _select_remote_files(self):
+        """Steps within the repair window of a tuple; None -> pull everything."""
+        remote_dir = self._remote_result_dir()
+        try:
+            listing = utils.exec(self._adb("exec-out", f"ls -1 {shlex.quote(remote_dir)}"), capture_result=True, timeout=60)
+            raw = utils.exec(
+                self._adb("exec-out", f"cat {shlex.quote(remote_dir + '/' + TUPLE_FILENAME)}"),
+                capture_result=True,
+                timeout=60,
+            )
+            seqs = json.loads(raw.stdout)
+        except Exception as exc:
+            logger.warning("selective pull disabled for %s: %s", self._package, exc)
+            return None
+        names = [n.strip() for n in listing.stdout.splitlines() if n.strip()]
+        return repair_window_files(names, seqs)
+
+    def _pull_dir(self, local_dir, files=None):
+        remote_dir = self._remote_result_dir()
+        if files is None:
+            command = self._adb("pull", remote_dir + "/", self.output_dir)
+        else:
+            os.makedirs(local_dir, exist_ok=True)
+            command = self._adb("pull", *[f"{remote_dir}/{name}" for name in files], local_dir)
+        utils.exec(command, timeout=settings.ADB_PULL_TIMEOUT_SECONDS)
+        return sum(e.stat().st_size for e in os.scandir(local_dir) if e.is_file()) if os.path.isdir(local_dir) else 0
+
+    def _pull_archive(self, local_dir, files=None, gzip=False):
+        """
+        Stream `tar -c` of the result dir through `adb exec-out` and unpack it
+        locally: one transfer instead of one adb sync request per file.
+        Returns bytes received over adb.
+        """
+        remote_dir = self._remote_result_dir()
+        # A selection goes to tar on stdin (-T -): thousands of step files
+        # would overflow the device shell's command line.
+        members = "-T -" if files is not None else "."
+        command = self._adb(
+            "exec-out",
+            f"cd {shlex.quote(remote_dir)} && tar -c{'z' if gzip else ''}f - {members}",
+        )
+        proc = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE if files is not None else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        timer = threading.Timer(settings.ADB_PULL_TIMEOUT_SECONDS, proc.kill)
+        timer.start()
+        stream = _CountingReader(proc.stdout)
+        try:
+            if files is not None:
+                # tar reads the whole list before it writes, so this cannot block on stdout.
+                with proc.stdin:
+                    proc.stdin.write("".join(f"{name}\n" for name in files).encode("utf-8"))
+            os.makedirs(local_dir, exist_ok=True)
+            with tarfile.open(fileobj=stream, mode="r|gz" if gzip else "r|") as tar:
+                for member in tar:
+                    name = member.name[2:] if member.name.startswith("./") else member.name
+                    # Fastbot output is flat; never write outside local_dir.
+                    if not member.isfile() or not name or "/" in name or name.startswith(".."):
+                        continue
+                    src = tar.extractfile(member)
+                    with open(os.path.join(local_dir, name), "wb") as dst:
+                        shutil.copyfileobj(src, dst)
+            stream.drain()
+        finally:
+            timer.cancel()
+            stderr = proc.stderr.read().decode("utf-8", "ignore").strip()
+            returncode = proc.wait()
+        if returncode != 0:
+            raise RuntimeError(f"archive pull exited with {returncode}: {stderr}")
+        return stream.count
 
     def _pull_result(self):
-        android_data_dir = settings.ANDROID_DATA_DIR + "/" + self.fastbot_output_dir + "/"
-        utils.delete_directory(os.path.join(self.output_dir, self.fastbot_output_dir))
+        local_dir = os.path.join(self.output_dir, self.fastbot_output_dir)
+        utils.delete_directory(local_dir)
         os.makedirs(self.output_dir, exist_ok=True)
 
-        command = ["adb", "pull", android_data_dir, self.output_dir]
-        utils.exec(command, timeout=settings.ADB_PULL_TIMEOUT_SECONDS)
+        mode = settings.PHASE1_PULL_MODE
+        if mode not in PULL_MODES:
+            raise ValueError(f"unknown pull mode: {mode}")
+        started = time.perf_counter()
+        files = self._select_remote_files() if settings.PHASE1_PULL_SELECTIVE else None
+        if mode in ("tar", "tgz"):
+            try:
+                transferred = self._pull_archive(local_dir, files, gzip=mode == "tgz")
+            except Exception as exc:
+                # Old devices without toybox tar: fall back to a plain pull.
+                logger.warning("archive pull failed for %s, falling back to adb pull: %s", self._package, exc)
+                utils.delete_directory(local_dir)
+                mode = "dir"
+        if mode not in ("tar", "tgz"):
+            transferred = self._pull_dir(local_dir, files)
+
+        pulled = [e for e in os.scandir(local_dir) if e.is_file()] if os.path.isdir(local_dir) else []
+        self.pull_stats = {
+            "mode": mode,
+            "selective": files is not None,
+            "seconds": round(time.perf_counter() - started, 3),
+            "bytes": transferred,
+            "files": len(pulled),
+            "local_bytes": sum(e.stat().st_size for e in pulled),
+        }
+        logger.info(
+            "pulled %s: %d files, %d bytes in %.1fs (mode=%s, selective=%s)",
+            self._package,
+            self.pull_stats["files"],
+            transferred,
+            self.pull_stats["seconds"],
+            mode,
+            self.pull_stats["selective"],
+        )
 
     def run(self, skip_if_result_exist=False):
         if skip_if_result_exist:
@@ -143,8 +386,8 @@ class DataCollectAgent:
                 return "recovered_with_output"
             raise RuntimeError(f"fastbot failed and no output recovered: {fastbot_error}") from fastbot_error
         return "success"
-
-
+
+
 if __name__ == "__main__":
     import argparse
 
@@ -1,8 +1,17 @@
 import os
 import re
+import sys
 import json
-from collections import defaultdict
-from typing import Any, Dict, List, Optional
+import hashlib
+import subprocess
+import tempfile
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 from PIL import Image
 from xml.etree import ElementTree as ET
 
@@ -13,6 +22,22 @@ import unicodedata
 from tqdm import tqdm
 
 from configs import settings
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from data_pipline.chain_render import (
+    CHAIN_IMAGE_RE,
+    FIXED_HEIGHT,
+    MANIFEST_FILENAME,
+    chain_image_name,
+    load_chain_frame,
+    normalize_to_portrait,
+)
+from data_pipline.phase2_cache import DEFAULT_CACHE_FILENAME, Phase2Cache, file_digest
+from data_pipline.step_index import REPAIR_WINDOW, STEP_RE
+from utils.validators import SCREEN_STORE_FORMAT
 
 # =========================================================
 # PATH CONFIG (override via env or CLI)
@@ -21,9 +46,44 @@ from configs import settings
 RAW_ROOT = settings.DATA_RAW_DIR
 DST_ROOT = settings.DATA_PROCESSED_DIR
 
-STEP_RE = re.compile(r"step-(\d+)-.*\.png$")
-FIXED_HEIGHT = 1600
-_WIDGET_PARSE_CACHE: Dict[str, List[Dict[str, Any]]] = {}
+OCR_SCALES = (1.0, 1.5, 2.0)
+OCR_MODES = ("multiscale", "adaptive")
+OCR_BACKENDS = ("pytesseract", "batch")
+OCR_POLICIES = ("always", "widget_first")
+OCR_DECISIONS_FILENAME = "phase2_ocr_decisions.json"
+# chains: legacy result.json, features inlined per chain entry; screens: SCREEN_STORE_FORMAT
+RESULT_FORMATS = ("chains", "screens")
+# eager: write every chain_{i}.png now; lazy: leave it to data_pipline.chain_render
+CHAIN_IMAGE_MODES = ("eager", "lazy")
+# Bump when process_app output changes for identical inputs and config.
+PHASE2_OUTPUT_VERSION = "phase2-v1"
+
+
+@dataclass(frozen=True)
+class Phase2Config:
+    """Per-run phase2 knobs; picklable so it can be shipped to app workers."""
+    ocr_mode: str = settings.PHASE2_OCR_MODE
+    ocr_min_conf: float = settings.PHASE2_OCR_MIN_CONF
+    ocr_min_chars: int = settings.PHASE2_OCR_MIN_CHARS
+    # "auto": <dst_root>/.phase2_cache.sqlite, "off": disabled, else explicit path
+    cache_path: str = settings.PHASE2_CACHE_PATH
+    # pytesseract: one tesseract process per image/scale; batch: one per group of images
+    ocr_backend: str = settings.PHASE2_OCR_BACKEND
+    ocr_batch_size: int = settings.PHASE2_OCR_BATCH_SIZE
+    # crop to the permission dialog / content area from the XML bounds before OCR
+    ocr_roi: bool = settings.PHASE2_OCR_ROI
+    # always: OCR every step; widget_first: reuse XML widget text when it covers the screen
+    ocr_policy: str = settings.PHASE2_OCR_POLICY
+    widget_text_min_coverage: float = settings.PHASE2_WIDGET_TEXT_MIN_COVERAGE
+    result_format: str = settings.PHASE2_RESULT_FORMAT
+    # 0 keeps every widget; K keeps text widgets among the top-K texts or scoring >= floor
+    widget_top_k: int = settings.PHASE2_WIDGET_TOP_K
+    widget_score_floor: float = settings.PHASE2_WIDGET_SCORE_FLOOR
+    # share OCR/decoded images between steps with the same XML and a dHash within this distance
+    dedupe: bool = settings.PHASE2_DEDUPE
+    dedupe_max_distance: int = settings.PHASE2_DEDUPE_MAX_DISTANCE
+    chain_images: str = settings.PHASE2_CHAIN_IMAGES
+
 
 # =========================================================
 # IO
@@ -41,15 +101,112 @@ def write_json(o, p: str):
     with open(p, "w", encoding="utf-8") as f:
         json.dump(o, f, ensure_ascii=False, indent=2)
 
+# =========================================================
+# 有界缓存 / 内存统计
+# =========================================================
+
+class LRUCache:
+    """Size-bounded LRU dict with hit/miss/eviction counters."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = max(1, maxsize)
+        self._data: "OrderedDict[Any, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key, default=None):
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._data.clear()
+
+    def drain_stats(self, prefix: str) -> Dict[str, int]:
+        """Counters since the last drain, as stat keys, then reset them."""
+        out = {
+            f"{prefix}_hit": self.hits,
+            f"{prefix}_miss": self.misses,
+            f"{prefix}_evict": self.evictions,
+        }
+        self.hits = self.misses = self.evictions = 0
+        return out
+
+
+def peak_rss_kb() -> int:
+    """Peak resident set size of this process in KiB (0 where unsupported)."""
+    if resource is None:
+        return 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+class StageTimer:
+    """
+    Wall seconds per named stage. Stages may nest; time spent in an inner
+    stage is not counted again in the outer one.
+    """
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self._stack: List[List[Any]] = []
+
+    @contextmanager
+    def stage(self, name: str):
+        now = time.perf_counter()
+        if self._stack:
+            outer = self._stack[-1]
+            self.seconds[outer[0]] += now - outer[1]
+        self._stack.append([name, now])
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            inner, start = self._stack.pop()
+            self.seconds[inner] += now - start
+            if self._stack:
+                self._stack[-1][1] = now
+
+    def drain_stats(self) -> Dict[str, float]:
+        out = {f"time_{k}_s": v for k, v in self.seconds.items()}
+        self.seconds = defaultdict(float)
+        return out
+
+
+# One app at a time per process, like _WIDGET_PARSE_CACHE; drained in _process_app_task.
+_STAGE_TIMER = StageTimer()
+
 # =========================================================
 # OCR (增强版，但不过重)
 # =========================================================
 
-def ocr_preprocess(image_path):
+def ocr_preprocess(image_path, roi=None):
     img = cv2.imread(image_path)
     if img is None:
         return None
 
+    if roi is not None:
+        box = scale_roi(roi, img.shape[1], img.shape[0])
+        if box is not None:
+            x1, y1, x2, y2 = box
+            img = img[y1:y2, x1:x2]
+
     gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
 
     gamma = 1.4
@@ -72,13 +229,49 @@ def clean_ocr_text(text):
     text = re.sub(r"[^\u4e00-\u9fa5A-Za-z0-9，。？！：+-]", "", text)
     return text.strip()
 
-def ocr_image(image_path):
-    bin_img = ocr_preprocess(image_path)
-    if bin_img is None:
-        return ""
-
+def _ocr_pass(bin_img, scale: float) -> Tuple[str, float]:
+    """One tesseract pass; returns (raw text, mean word confidence)."""
+    resized = cv2.resize(bin_img, None, fx=scale, fy=scale)
+    data = pytesseract.image_to_data(
+        Image.fromarray(resized),
+        lang="chi_sim",
+        output_type=pytesseract.Output.DICT,
+    )
+    words, confs = [], []
+    for txt, conf in zip(data.get("text", []), data.get("conf", [])):
+        txt = (txt or "").strip()
+        try:
+            conf = float(conf)
+        except (TypeError, ValueError):
+            conf = -1.0
+        if not txt or conf < 0:
+            continue
+        words.append(txt)
+        confs.append(conf)
+    mean_conf = sum(confs) / len(confs) if confs else 0.0
+    return " ".join(words), mean_conf
+
+
+def ocr_image_adaptive(bin_img, min_conf: float, min_chars: int) -> Tuple[str, int]:
+    """
+    Cheap 1.0x pass first; escalate to larger scales only while the best
+    pass so far is low-confidence or too short. Returns (text, passes).
+    """
+    best_text, best_conf = "", -1.0
+    passes = 0
+    for scale in OCR_SCALES:
+        txt, conf = _ocr_pass(bin_img, scale)
+        passes += 1
+        if conf > best_conf:
+            best_text, best_conf = txt, conf
+        if best_conf >= min_conf and len(clean_ocr_text(best_text)) >= min_chars:
+            break
+    return clean_ocr_text(best_text), passes
+
+
+def ocr_image_multiscale(bin_img) -> str:
     texts = []
-    for scale in (1.0, 1.5, 2.0):
+    for scale in OCR_SCALES:
         resized = cv2.resize(bin_img, None, fx=scale, fy=scale)
         txt = pytesseract.image_to_string(
             Image.fromarray(resized),
@@ -88,6 +281,138 @@ def ocr_image(image_path):
 
     return clean_ocr_text("\n".join(texts))
 
+
+def ocr_image(image_path, cfg: Optional[Phase2Config] = None, stat: Optional[Dict[str, int]] = None):
+    cfg = cfg or Phase2Config()
+    bin_img = ocr_preprocess(image_path, step_roi(image_path, cfg, stat))
+    if bin_img is None:
+        return ""
+
+    if cfg.ocr_mode == "adaptive":
+        text, passes = ocr_image_adaptive(bin_img, cfg.ocr_min_conf, cfg.ocr_min_chars)
+    else:
+        text, passes = ocr_image_multiscale(bin_img), len(OCR_SCALES)
+
+    if stat is not None:
+        stat["ocr_images"] += 1
+        stat["ocr_passes"] += passes
+    return text
+
+# =========================================================
+# OCR batch backend（一次 tesseract 进程处理一组图片）
+# =========================================================
+
+_TESSERACT_SECONDS_PER_PAGE = 30
+
+
+def _parse_tsv_pages(tsv: str, n_pages: int) -> Optional[List[Tuple[str, float]]]:
+    words: List[List[str]] = [[] for _ in range(n_pages)]
+    confs: List[List[float]] = [[] for _ in range(n_pages)]
+    seen = set()
+    for line in tsv.splitlines():
+        cols = line.split("\t")
+        if len(cols) < 12:
+            continue
+        try:
+            level, page, conf = int(cols[0]), int(cols[1]) - 1, float(cols[10])
+        except ValueError:
+            continue  # header
+        if not 0 <= page < n_pages:
+            return None
+        seen.add(page)
+        txt = cols[11].strip()
+        if level != 5 or not txt or conf < 0:
+            continue
+        words[page].append(txt)
+        confs[page].append(conf)
+    if len(seen) != n_pages:
+        return None
+    return [
+        (" ".join(w), sum(c) / len(c) if c else 0.0)
+        for w, c in zip(words, confs)
+    ]
+
+
+def tesseract_batch(images: List[np.ndarray]) -> List[Tuple[str, float]]:
+    """
+    OCR many images with a single tesseract process (file-list input, TSV
+    output) so process startup and chi_sim model load are paid once.
+    Returns (raw text, mean word confidence) per image, in input order.
+    """
+    if not images:
+        return []
+    pages = None
+    with tempfile.TemporaryDirectory(prefix="llmmui_ocr_") as tmp:
+        paths = []
+        for i, img in enumerate(images):
+            path = os.path.join(tmp, f"page_{i:05d}.png")
+            cv2.imwrite(path, img)
+            paths.append(path)
+        list_path = os.path.join(tmp, "pages.txt")
+        with open(list_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(paths) + "\n")
+        try:
+            proc = subprocess.run(
+                [pytesseract.pytesseract.tesseract_cmd, list_path, "stdout", "-l", "chi_sim", "tsv"],
+                capture_output=True,
+                timeout=_TESSERACT_SECONDS_PER_PAGE * len(images),
+            )
+            if proc.returncode == 0:
+                pages = _parse_tsv_pages(proc.stdout.decode("utf-8", errors="ignore"), len(images))
+        except (OSError, subprocess.TimeoutExpired):
+            pages = None
+    if pages is None:
+        # Never guess the page mapping; redo the group one image at a time.
+        return [_ocr_pass(img, 1.0) for img in images]
+    return pages
+
+
+def _ocr_group_batch(bins: Dict[str, np.ndarray], cfg: Phase2Config, stat: Dict[str, int]) -> Dict[str, str]:
+    def run(jobs: List[Tuple[str, float]]) -> List[Tuple[str, float]]:
+        stat["ocr_batches"] += 1
+        stat["ocr_passes"] += len(jobs)
+        return tesseract_batch([cv2.resize(bins[p], None, fx=sc, fy=sc) for p, sc in jobs])
+
+    if cfg.ocr_mode == "adaptive":
+        best = {p: ("", -1.0) for p in bins}
+        pending = list(bins)
+        for scale in OCR_SCALES:
+            if not pending:
+                break
+            still = []
+            for p, (txt, conf) in zip(pending, run([(p, scale) for p in pending])):
+                if conf > best[p][1]:
+                    best[p] = (txt, conf)
+                bt, bc = best[p]
+                if bc < cfg.ocr_min_conf or len(clean_ocr_text(bt)) < cfg.ocr_min_chars:
+                    still.append(p)
+            pending = still
+        return {p: clean_ocr_text(txt) for p, (txt, _) in best.items()}
+
+    jobs = [(p, sc) for p in bins for sc in OCR_SCALES]
+    texts: Dict[str, List[str]] = defaultdict(list)
+    for (p, _), (txt, _) in zip(jobs, run(jobs)):
+        texts[p].append(txt)
+    return {p: clean_ocr_text("\n".join(texts[p])) for p in bins}
+
+
+def ocr_images_batch(paths: List[str], cfg: Phase2Config, stat: Dict[str, int]) -> Dict[str, str]:
+    """Batch-backend equivalent of {p: ocr_image(p, cfg) for p in paths}."""
+    out: Dict[str, str] = {}
+    group_size = max(1, cfg.ocr_batch_size)
+    for i in range(0, len(paths), group_size):
+        bins: Dict[str, np.ndarray] = {}
+        for p in paths[i:i + group_size]:
+            bin_img = ocr_preprocess(p, step_roi(p, cfg, stat))
+            if bin_img is None:
+                out[p] = ""
+            else:
+                bins[p] = bin_img
+        if bins:
+            stat["ocr_images"] += len(bins)
+            out.update(_ocr_group_batch(bins, cfg, stat))
+    return out
+
 # =========================================================
 # XML / widgets + 强化打分
 # =========================================================
@@ -105,115 +430,357 @@ ACTION_WORDS = [
     "允许", "拒绝", "仅在使用中", "本次运行", "始终允许"
 ]
 
-def parse_widgets(xml_path: str):
-    xml_path = os.path.abspath(xml_path)
-    if not os.path.exists(xml_path):
-        return []
+PERMISSION_RID_WORDS = [
+    "permission_group_title",
+    "permission_applicant",
+    "permissioncontroller",
+    "miui"
+]
+
+SYSTEM_PERMISSION_RID_WORDS = [
+    "permission_group_title",
+    "permission_allow",
+    "permission_deny",
+    "permissioncontroller",
+    "miui"
+]
+
+
+class KeywordMatcher:
+    """
+    All keyword categories found in a string, in one regex pass.
+
+    The keywords are compiled into a single lookahead alternation (longest
+    first), so every start position reports its longest keyword; keywords
+    contained in a matched keyword are folded in up front, which keeps
+    shorter overlapping words (e.g. 允许 inside 始终允许) from being lost.
+    """
+
+    def __init__(self, categories: Dict[str, List[str]]):
+        implied: Dict[str, set] = {}
+        for cat, words in categories.items():
+            for w in words:
+                implied.setdefault(w, set())
+        for w in implied:
+            for cat, words in categories.items():
+                if any(k in w for k in words):
+                    implied[w].add(cat)
+        self._implied = {w: frozenset(c) for w, c in implied.items()}
+        alts = "|".join(re.escape(w) for w in sorted(implied, key=len, reverse=True))
+        self._re = re.compile(f"(?=({alts}))")
+        self.hits = lru_cache(maxsize=65536)(self._hits)
+
+    def _hits(self, s: str) -> frozenset:
+        if not s:
+            return frozenset()
+        found = {m.group(1) for m in self._re.finditer(s)}
+        if not found:
+            return frozenset()
+        return frozenset().union(*(self._implied[w] for w in found))
+
+
+TEXT_MATCHER = KeywordMatcher({
+    "semantic": PERMISSION_SEMANTIC_WORDS,
+    "action": ACTION_WORDS,
+    "allow": ["允许"],
+    "deny": ["拒绝"],
+})
+# Applied to lower-cased resource ids.
+RID_MATCHER = KeywordMatcher({
+    "score": PERMISSION_RID_WORDS,
+    "system": SYSTEM_PERMISSION_RID_WORDS,
+    "permission": ["permission"],
+    "miui": ["miui"],
+})
+
+
+def screen_hits(ws) -> Tuple[frozenset, frozenset]:
+    """Union of text and resource-id keyword categories over a widget table."""
+    text_hits: set = set()
+    rid_hits: set = set()
+    for w in ws:
+        text_hits |= TEXT_MATCHER.hits(w.text)
+        rid_hits |= RID_MATCHER.hits(w.resource_id.lower())
+    return frozenset(text_hits), frozenset(rid_hits)
+
+
+class Widget(NamedTuple):
+    """One UI node; immutable so parsed screens can be shared without copying."""
+    text: str
+    cls: str
+    resource_id: str
+    depth: int
+
+
+# Cleared after every app (see _process_app_task); the bound covers apps with huge step counts.
+_WIDGET_PARSE_CACHE = LRUCache(settings.PHASE2_WIDGET_CACHE_SIZE)
 
+
+def parse_widgets(xml_path: str) -> Tuple[Widget, ...]:
+    """
+    Flat pre-order widget table of a UIAutomator dump. The returned tuple is
+    cached and shared between callers; treat it as read-only.
+    """
+    xml_path = os.path.abspath(xml_path)
     cached = _WIDGET_PARSE_CACHE.get(xml_path)
     if cached is not None:
-        return [w.copy() for w in cached]
+        return cached
+    if not os.path.exists(xml_path):
+        return ()
 
+    widgets = []
+    depth = -1
     try:
-        with open(xml_path, encoding="utf-8") as f:
-            root = ET.fromstring(f.read())
+        with _STAGE_TIMER.stage("xml_parse"):
+            for event, elem in ET.iterparse(xml_path, events=("start", "end")):
+                if event == "end":
+                    depth -= 1
+                    elem.clear()
+                    continue
+                depth += 1
+                attrib = elem.attrib
+                widgets.append(Widget(
+                    attrib.get("text", "") or "",
+                    attrib.get("class", "") or "",
+                    attrib.get("resource-id", "") or "",
+                    depth,
+                ))
     except Exception:
-        return []
+        return ()
 
-    widgets = []
+    table = tuple(widgets)
+    _WIDGET_PARSE_CACHE.put(xml_path, table)
+    return table
 
-    def dfs(n, depth=0):
-        widgets.append({
-            "text": n.attrib.get("text", "") or "",
-            "class": n.attrib.get("class", "") or "",
-            "resource-id": n.attrib.get("resource-id", "") or "",
-            "depth": depth,
-        })
-        for c in n:
-            dfs(c, depth + 1)
-
-    dfs(root)
-    _WIDGET_PARSE_CACHE[xml_path] = widgets
-    return [w.copy() for w in widgets]
-
-def widget_score(w):
-    score = 0
-    txt = w["text"]
-    rid = w["resource-id"].lower()
-
-    # ⭐⭐⭐⭐ 权限语义
-    if any(k in txt for k in PERMISSION_SEMANTIC_WORDS):
-        score += 12
-
-    # ⭐⭐⭐ permission 结构
-    if any(k in rid for k in [
-        "permission_group_title",
-        "permission_applicant",
-        "permissioncontroller",
-        "miui"
-    ]):
-        score += 10
-
-    # ⭐⭐ 操作按钮
-    if any(k in txt for k in ACTION_WORDS):
-        score += 6
-
-    # ⭐ UI 基础
-    if w["class"].endswith("TextView") or w["class"].endswith("Button"):
-        score += 2
-
-    score += max(0, 6 - w["depth"]) * 0.6
-    return score
-
-def enrich_widgets(xml_path):
-    ws = parse_widgets(xml_path)
+def widget_scores(ws) -> List[float]:
+    """Scores for a whole widget table, in table order."""
+    scores = []
     for w in ws:
-        w["score"] = widget_score(w)
+        score = 0
+        text_hits = TEXT_MATCHER.hits(w.text)
+
+        # ⭐⭐⭐⭐ 权限语义
+        if "semantic" in text_hits:
+            score += 12
+
+        # ⭐⭐⭐ permission 结构
+        if "score" in RID_MATCHER.hits(w.resource_id.lower()):
+            score += 10
+
+        # ⭐⭐ 操作按钮
+        if "action" in text_hits:
+            score += 6
+
+        # ⭐ UI 基础
+        if w.cls.endswith("TextView") or w.cls.endswith("Button"):
+            score += 2
+
+        score += max(0, 6 - w.depth) * 0.6
+        scores.append(score)
+    return scores
+
+def enrich_widgets(xml_path) -> List[Dict[str, Any]]:
+    table = parse_widgets(xml_path)
+    ws = [
+        {
+            "text": w.text,
+            "class": w.cls,
+            "resource-id": w.resource_id,
+            "depth": w.depth,
+            "score": score,
+        }
+        for w, score in zip(table, widget_scores(table))
+    ]
     ws.sort(key=lambda x: x["score"], reverse=True)
     return ws
 
+def widget_retention(cfg: Phase2Config) -> Dict[str, Any]:
+    if cfg.widget_top_k <= 0:
+        return {"policy": "all"}
+    return {"policy": "text_top_k", "top_k": cfg.widget_top_k, "score_floor": cfg.widget_score_floor}
+
+
+def retain_widgets(ws: List[Dict[str, Any]], cfg: Phase2Config) -> List[Dict[str, Any]]:
+    """
+    Drop widgets phase3 never reads. From a score-sorted enrich_widgets list
+    keep text widgets whose stripped text is among the first top_k distinct
+    texts (chain_summary top widgets) or whose score reaches score_floor
+    (run_permission_rule WIDGET_SCORE_THRESHOLD). Order is preserved.
+    """
+    if cfg.widget_top_k <= 0:
+        return ws
+    top_texts = set()
+    out = []
+    for w in ws:
+        txt = w["text"]
+        key = txt.strip()
+        in_top = bool(key) and (key in top_texts or len(top_texts) < cfg.widget_top_k)
+        if in_top:
+            top_texts.add(key)
+        if in_top or (txt and w["score"] >= cfg.widget_score_floor):
+            out.append(w)
+    return out
+
 # =========================================================
 # Permission detection（严格）
 # =========================================================
 
 def contains_permission_word(ws):
-    texts = [w.get("text", "") for w in ws]
-    rids = " ".join(
-        (w.get("resource-id") or "").lower()
-        for w in ws
-    )
-    if "permission" in rids:
-        return True
-    if any("允许" in t or "拒绝" in t for t in texts):
-        return True
-    return False
+    text_hits, rid_hits = screen_hits(ws)
+    return "permission" in rid_hits or "allow" in text_hits or "deny" in text_hits
 
 def is_system_permission(ws) -> bool:
-    texts = [w.get("text", "") for w in ws]
-    if not (any("允许" in t for t in texts) and any("拒绝" in t for t in texts)):
+    text_hits, rid_hits = screen_hits(ws)
+    if not ("allow" in text_hits and "deny" in text_hits):
         return False
-
-    rids = " ".join(
-        (w.get("resource-id") or "").lower()
-        for w in ws
-    )
-    return any(k in rids for k in [
-        "permission_group_title",
-        "permission_allow",
-        "permission_deny",
-        "permissioncontroller",
-        "miui"
-    ])
+    return "system" in rid_hits
 
 def permission_signature(ws) -> str:
     parts = []
     for w in ws:
-        rid = (w.get("resource-id") or "").lower()
-        txt = w.get("text", "")
-        if "permission" in rid or "miui" in rid:
-            parts.append(rid + ":" + txt)
+        rid = w.resource_id.lower()
+        hits = RID_MATCHER.hits(rid)
+        if "permission" in hits or "miui" in hits:
+            parts.append(rid + ":" + w.text)
     return "|".join(parts)
 
+# =========================================================
+# ROI（按 XML bounds 裁剪 OCR 区域）
+# =========================================================
+
+_BOUNDS_RE = re.compile(r"\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]")
+ROI_PAD = 16
+ROI_MIN_AREA_RATIO = 0.05
+_STATUS_BAR_RIDS = ("statusbarbackground",)
+_NAV_BAR_RIDS = ("navigationbarbackground",)
+
+
+def _union(boxes):
+    return (
+        min(b[0] for b in boxes), min(b[1] for b in boxes),
+        max(b[2] for b in boxes), max(b[3] for b in boxes),
+    )
+
+
+def xml_roi(xml_path: str):
+    """
+    OCR region in XML (device) coordinates: ((x1, y1, x2, y2), (screen_w, screen_h)).
+    Granting screens crop to the permission dialog body; other screens to
+    the app content area without the status/navigation bars.
+    """
+    try:
+        nodes = []
+        for _, elem in ET.iterparse(xml_path):
+            if elem.tag != "node":
+                continue
+            m = _BOUNDS_RE.match(elem.attrib.get("bounds", "") or "")
+            if m:
+                box = tuple(int(v) for v in m.groups())
+                if box[2] > box[0] and box[3] > box[1]:
+                    nodes.append((
+                        (elem.attrib.get("resource-id") or "").lower(),
+                        elem.attrib.get("text", "") or "",
+                        box,
+                    ))
+            elem.clear()
+    except Exception:
+        return None
+    if not nodes:
+        return None
+
+    screen = _union([b for _, _, b in nodes])
+    screen_size = (screen[2], screen[3])
+
+    if is_system_permission(parse_widgets(xml_path)):
+        dialog = [
+            b for rid, txt, b in nodes
+            if "permission" in rid or "miui" in rid or "允许" in txt or "拒绝" in txt
+        ]
+        if not dialog:
+            return None
+        x1, y1, x2, y2 = _union(dialog)
+        box = (x1 - ROI_PAD, y1 - ROI_PAD, x2 + ROI_PAD, y2 + ROI_PAD)
+    else:
+        content = [b for rid, _, b in nodes if rid == "android:id/content"]
+        x1, y1, x2, y2 = content[0] if content else screen
+        for rid, _, b in nodes:
+            if any(k in rid for k in _STATUS_BAR_RIDS) and b[3] > y1 and b[1] <= y1:
+                y1 = b[3]
+            if any(k in rid for k in _NAV_BAR_RIDS) and b[1] < y2 and b[3] >= y2:
+                y2 = b[1]
+        box = (x1, y1, x2, y2)
+    return box, screen_size
+
+
+def scale_roi(roi, img_w: int, img_h: int):
+    """Map an xml_roi() result onto the screenshot; None means OCR the full image."""
+    (x1, y1, x2, y2), (screen_w, screen_h) = roi
+    if screen_w <= 0 or screen_h <= 0:
+        return None
+    sx, sy = img_w / screen_w, img_h / screen_h
+    # Rotated or letterboxed screenshot: bounds do not map, keep the full frame.
+    if abs(sx - sy) > 0.05 * max(sx, sy):
+        return None
+    box = (
+        max(0, int(x1 * sx)), max(0, int(y1 * sy)),
+        min(img_w, int(x2 * sx)), min(img_h, int(y2 * sy)),
+    )
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    if box[2] <= box[0] or box[3] <= box[1] or area < ROI_MIN_AREA_RATIO * img_w * img_h:
+        return None
+    return box
+
+
+def step_roi(image_path: str, cfg: Phase2Config, stat: Optional[Dict[str, int]] = None):
+    if not cfg.ocr_roi:
+        return None
+    xml = image_path.replace(".png", ".xml")
+    roi = xml_roi(xml) if os.path.exists(xml) else None
+    if stat is not None:
+        stat["ocr_roi_cropped" if roi is not None else "ocr_roi_full"] += 1
+    return roi
+
+# =========================================================
+# Widget-first：XML 文本足够时跳过 OCR
+# =========================================================
+
+WIDGET_TEXT_MIN_CHARS = 4
+# Content drawn outside the view tree; the XML cannot describe what is on screen.
+_OPAQUE_CLASS_WORDS = ("webview", "surfaceview", "textureview", "canvas")
+
+
+def widget_text_decision(xml_path: str, min_coverage: float) -> Dict[str, Any]:
+    """
+    Decide whether a step's widget text can stand in for OCR.
+    Coverage is the share of leaf nodes that carry text.
+    """
+    ws = parse_widgets(xml_path)
+    if not ws:
+        return {"skip_ocr": False, "reason": "no_widgets"}
+
+    for w in ws:
+        cls = w.cls.lower()
+        if any(k in cls for k in _OPAQUE_CLASS_WORDS):
+            return {"skip_ocr": False, "reason": "opaque_view", "class": w.cls}
+
+    leaves = [
+        w for i, w in enumerate(ws)
+        if i + 1 == len(ws) or ws[i + 1].depth <= w.depth
+    ]
+    coverage = sum(1 for w in leaves if w.text.strip()) / len(leaves)
+    text = clean_ocr_text(" ".join(w.text for w in ws if w.text))
+    decision = {"coverage": round(coverage, 3), "text_chars": len(text)}
+
+    if len(text) < WIDGET_TEXT_MIN_CHARS:
+        decision.update(skip_ocr=False, reason="too_little_text")
+    elif is_system_permission(ws):
+        decision.update(skip_ocr=True, reason="system_permission", text=text)
+    elif coverage >= min_coverage:
+        decision.update(skip_ocr=True, reason="text_coverage", text=text)
+    else:
+        decision.update(skip_ocr=False, reason="low_text_coverage")
+    return decision
+
 # =========================================================
 # step index
 # =========================================================
@@ -230,27 +797,30 @@ def build_step_index(app_dir: str):
 # Image merge（全部竖图 → 横拼）
 # =========================================================
 
-def normalize_to_portrait(im: Image.Image) -> Image.Image:
-    if im.width > im.height:
-        im = im.rotate(90, expand=True)
-    return im
+DECODED_IMAGE_CACHE_SIZE = 16
+
 
-def merge_images(imgs: List[str], out: str):
-    ims = []
+def merge_images(imgs: List[str], out: str, decoded: Optional[LRUCache] = None):
+    """
+    decoded: optional per-app LRU of resized frames, so a step shared by
+    several chains is decoded once.
+    """
+    resized = []
     for p in imgs:
-        if os.path.exists(p):
-            im = Image.open(p).convert("RGB")
-            ims.append(normalize_to_portrait(im))
+        if not os.path.exists(p):
+            continue
+        if decoded is None:
+            resized.append(load_chain_frame(p))
+            continue
+        im = decoded.get(p)
+        if im is None:
+            im = load_chain_frame(p)
+            decoded.put(p, im)
+        resized.append(im)
 
-    if not ims:
+    if not resized:
         return
 
-    resized = []
-    for im in ims:
-        w, h = im.size
-        new_w = int(w * FIXED_HEIGHT / h)
-        resized.append(im.resize((new_w, FIXED_HEIGHT)))
-
     canvas = Image.new(
         "RGB",
         (sum(im.width for im in resized), FIXED_HEIGHT),
@@ -265,23 +835,103 @@ def merge_images(imgs: List[str], out: str):
     safe_mkdir(os.path.dirname(out))
     canvas.save(out)
 
+# =========================================================
+# 近重复截图去重（dHash + XML 签名）
+# =========================================================
+
+def image_dhash(image_path: str) -> Optional[int]:
+    """64-bit difference hash of a screenshot; None if it cannot be decoded."""
+    gray = cv2.imread(image_path, cv2.IMREAD_REDUCED_GRAYSCALE_8)
+    if gray is None:
+        return None
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int("".join("1" if b else "0" for b in bits), 2)
+
+
+def xml_signature(xml_path: str) -> str:
+    return hashlib.sha1(repr(parse_widgets(xml_path)).encode("utf-8")).hexdigest()
+
+
+def dedupe_steps(paths: List[str], max_distance: int, stat: Dict[str, int]) -> Dict[str, str]:
+    """
+    Map every step image to the first earlier step with the same XML widget
+    table and a dHash within max_distance bits (itself if none).
+    """
+    canon: Dict[str, str] = {}
+    reps: Dict[str, List[Tuple[int, str]]] = defaultdict(list)
+    for p in paths:
+        stat["dedupe_steps"] += 1
+        h = image_dhash(p) if os.path.exists(p) else None
+        if h is None:
+            canon[p] = p
+            continue
+        group = reps[xml_signature(p.replace(".png", ".xml"))]
+        for rh, rp in group:
+            if bin(h ^ rh).count("1") <= max_distance:
+                canon[p] = rp
+                stat["dedupe_duplicates"] += 1
+                break
+        else:
+            group.append((h, p))
+            canon[p] = p
+    return canon
+
 # =========================================================
 # repair_chain（你已验证稳定）
 # =========================================================
 
-def repair_chain(app_dir, steps, idx2png, seq) -> Optional[List[str]]:
+class StepInfo(NamedTuple):
+    permission_word: bool
+    system_permission: bool
+    signature: str
+
+
+_NO_XML_STEP = StepInfo(False, False, "")
+
+
+def classify_step(xml_path: str) -> StepInfo:
+    ws = parse_widgets(xml_path)
+    if not ws:
+        return _NO_XML_STEP
+    system = is_system_permission(ws)
+    return StepInfo(
+        contains_permission_word(ws),
+        system,
+        permission_signature(ws) if system else "",
+    )
+
+
+def build_step_table(app_dir: str, idx2png: Dict[int, str], seqs) -> Dict[str, StepInfo]:
+    """
+    Classify every step repair_chain can reach (tuple span +/- REPAIR_WINDOW)
+    once per app, keyed by png name.
+    """
+    names = set()
+    for seq in seqs:
+        b_idx = int(STEP_RE.match(seq[0]).group(1))
+        a_idx = int(STEP_RE.match(seq[-1]).group(1))
+        names.update((seq[0], seq[-1]))
+        for i in range(b_idx - REPAIR_WINDOW, a_idx + REPAIR_WINDOW + 1):
+            if i in idx2png:
+                names.add(idx2png[i])
+    return {
+        p: classify_step(os.path.join(app_dir, p.replace(".png", ".xml")))
+        for p in names
+    }
+
+
+def repair_chain(table: Dict[str, StepInfo], idx2png, seq) -> Optional[List[str]]:
     b_idx = int(STEP_RE.match(seq[0]).group(1))
-    ws = parse_widgets(os.path.join(app_dir, seq[0].replace(".png", ".xml")))
     start = b_idx
 
-    if contains_permission_word(ws):
+    if table[seq[0]].permission_word:
         found = False
-        for d in range(1, 4):
+        for d in range(1, REPAIR_WINDOW + 1):
             if b_idx - d not in idx2png:
                 break
             p = idx2png[b_idx - d]
-            ws2 = parse_widgets(os.path.join(app_dir, p.replace(".png", ".xml")))
-            if not contains_permission_word(ws2):
+            if not table[p].permission_word:
                 start = b_idx - d
                 found = True
                 break
@@ -289,17 +939,15 @@ def repair_chain(app_dir, steps, idx2png, seq) -> Optional[List[str]]:
             return None
 
     a_idx = int(STEP_RE.match(seq[-1]).group(1))
-    ws = parse_widgets(os.path.join(app_dir, seq[-1].replace(".png", ".xml")))
     end = a_idx
 
-    if is_system_permission(ws):
+    if table[seq[-1]].system_permission:
         found = False
-        for d in range(1, 4):
+        for d in range(1, REPAIR_WINDOW + 1):
             if a_idx + d not in idx2png:
                 break
             p = idx2png[a_idx + d]
-            ws2 = parse_widgets(os.path.join(app_dir, p.replace(".png", ".xml")))
-            if not is_system_permission(ws2):
+            if not table[p].system_permission:
                 end = a_idx + d
                 found = True
                 break
@@ -310,12 +958,7 @@ def repair_chain(app_dir, steps, idx2png, seq) -> Optional[List[str]]:
     if len(full) < 3:
         return None
 
-    sys = []
-    for p in full[1:-1]:
-        ws = parse_widgets(os.path.join(app_dir, p.replace(".png", ".xml")))
-        if is_system_permission(ws):
-            sig = permission_signature(ws)
-            sys.append((p, sig))
+    sys = [(p, table[p].signature) for p in full[1:-1] if table[p].system_permission]
 
     if not sys:
         return None
@@ -327,85 +970,521 @@ def repair_chain(app_dir, steps, idx2png, seq) -> Optional[List[str]]:
     grant = sorted(best.values(), key=lambda x: int(STEP_RE.match(x).group(1)))
     return [full[0]] + grant + [full[-1]]
 
+# =========================================================
+# Persistent OCR / enrichment cache
+# =========================================================
+
+# Bump when ocr_preprocess / clean_ocr_text / widget_scores change behaviour.
+OCR_PARAM_VERSION = "ocr-v1"
+ENRICH_PARAM_VERSION = "enrich-v1"
+
+
+@lru_cache(maxsize=1)
+def _tesseract_version() -> str:
+    try:
+        return str(pytesseract.get_tesseract_version())
+    except Exception:
+        return "unknown"
+
+
+@lru_cache(maxsize=None)
+def ocr_cache_version(cfg: Phase2Config) -> str:
+    parts = [OCR_PARAM_VERSION, cfg.ocr_mode, _tesseract_version()]
+    if cfg.ocr_roi:
+        parts.append("roi")
+    if cfg.ocr_mode == "adaptive":
+        parts += [str(cfg.ocr_min_conf), str(cfg.ocr_min_chars)]
+    return ":".join(parts)
+
+
+def ocr_cache_key(image_path: str, cfg: Phase2Config) -> str:
+    """With ROI cropping the text also depends on the XML bounds, so its digest joins the key."""
+    key = file_digest(image_path) + ":" + ocr_cache_version(cfg)
+    if cfg.ocr_roi:
+        xml = image_path.replace(".png", ".xml")
+        key += ":" + (file_digest(xml) if os.path.exists(xml) else "noxml")
+    return key
+
+
+@lru_cache(maxsize=1)
+def enrich_cache_version() -> str:
+    words = json.dumps(
+        [PERMISSION_SEMANTIC_WORDS, ACTION_WORDS, PERMISSION_RID_WORDS],
+        ensure_ascii=False,
+    )
+    return ENRICH_PARAM_VERSION + ":" + hashlib.sha1(words.encode("utf-8")).hexdigest()[:12]
+
+
+def resolve_cache_path(cfg: Phase2Config, dst_root: str) -> str:
+    path = (cfg.cache_path or "").strip()
+    if path.lower() in ("", "off", "none", "0"):
+        return ""
+    if path.lower() == "auto":
+        return os.path.join(dst_root, DEFAULT_CACHE_FILENAME)
+    return path
+
+
+def ocr_app_images(
+    paths: List[str],
+    cfg: Phase2Config,
+    stat: Dict[str, int],
+    store: Optional[Phase2Cache],
+    decisions: Optional[List[Dict[str, Any]]] = None,
+) -> Dict[str, str]:
+    """
+    Text for all step images of one app: widget text where the widget-first
+    policy allows it, then the persistent cache, then OCR.
+    """
+    out: Dict[str, str] = {}
+    keys: Dict[str, str] = {}
+    misses: List[str] = []
+    for p in paths:
+        if cfg.ocr_policy == "widget_first":
+            decision = widget_text_decision(p.replace(".png", ".xml"), cfg.widget_text_min_coverage)
+            if decisions is not None:
+                decisions.append({"file": os.path.basename(p), **decision})
+            if decision["skip_ocr"]:
+                stat["ocr_skipped_widget_text"] += 1
+                out[p] = decision["text"]
+                continue
+        if store is not None and os.path.exists(p):
+            key = ocr_cache_key(p, cfg)
+            text = store.get("ocr", key)
+            if isinstance(text, str):
+                stat["ocr_cache_hit"] += 1
+                out[p] = text
+                continue
+            stat["ocr_cache_miss"] += 1
+            keys[p] = key
+        misses.append(p)
+
+    if cfg.ocr_backend == "batch":
+        fresh = ocr_images_batch(misses, cfg, stat)
+    else:
+        fresh = {p: ocr_image(p, cfg, stat) for p in misses}
+
+    for p, text in fresh.items():
+        out[p] = text
+        if store is not None and p in keys:
+            store.put("ocr", keys[p], text)
+    return out
+
+
+def cached_enrich_widgets(xml: str, stat: Dict[str, int], store: Optional[Phase2Cache]) -> List[Dict[str, Any]]:
+    if store is None or not os.path.exists(xml):
+        return enrich_widgets(xml)
+    key = file_digest(xml) + ":" + enrich_cache_version()
+    ws = store.get("enrich", key)
+    if isinstance(ws, list):
+        stat["enrich_cache_hit"] += 1
+        return ws
+    stat["enrich_cache_miss"] += 1
+    ws = enrich_widgets(xml)
+    store.put("enrich", key, ws)
+    return ws
+
+# =========================================================
+# 增量 manifest（输入未变的 app 跳过）
+# =========================================================
+
+def app_input_digest(app_dir: str) -> str:
+    """
+    sha1 over (name, size, mtime_ns) of tupleOfPermissions.json and every
+    step png/xml. All steps count, not just the referenced ones, because
+    repair_chain may pull in neighbouring steps.
+    """
+    entries = []
+    with os.scandir(app_dir) as it:
+        for e in it:
+            name = e.name
+            if name == "tupleOfPermissions.json" or (
+                name.startswith("step-") and name.endswith((".png", ".xml"))
+            ):
+                st = e.stat()
+                entries.append((name, st.st_size, st.st_mtime_ns))
+    entries.sort()
+    return hashlib.sha1(json.dumps(entries).encode("utf-8")).hexdigest()
+
+
+def manifest_config_signature(cfg: Phase2Config) -> str:
+    return "|".join([
+        PHASE2_OUTPUT_VERSION,
+        ocr_cache_version(cfg),
+        enrich_cache_version(),
+        cfg.ocr_policy,
+        str(cfg.widget_text_min_coverage) if cfg.ocr_policy == "widget_first" else "",
+        cfg.result_format,
+        json.dumps(widget_retention(cfg), sort_keys=True),
+        f"dedupe{cfg.dedupe_max_distance}" if cfg.dedupe else "",
+        cfg.chain_images,
+    ])
+
+
+def load_current_manifest(app_dir: str, out_app: str, cfg: Phase2Config) -> Optional[Dict[str, Any]]:
+    """The app's manifest if its inputs and config are unchanged since it was written."""
+    path = os.path.join(out_app, MANIFEST_FILENAME)
+    if not os.path.isfile(path):
+        return None
+    try:
+        manifest = read_json(path)
+    except Exception:
+        return None
+    if not isinstance(manifest, dict):
+        return None
+    # Apps without any kept chain have no result.json, only the manifest.
+    if not manifest.get("empty") and not os.path.isfile(os.path.join(out_app, "result.json")):
+        return None
+    if manifest.get("config") != manifest_config_signature(cfg):
+        return None
+    if manifest.get("inputs") != app_input_digest(app_dir):
+        return None
+    return manifest
+
+
+def write_manifest(
+    out_app: str,
+    app_dir: str,
+    inputs: str,
+    cfg: Phase2Config,
+    stat: Dict[str, Any],
+    empty: bool = False,
+):
+    manifest: Dict[str, Any] = {
+        "inputs": inputs,
+        "config": manifest_config_signature(cfg),
+        "widget_retention": widget_retention(cfg),
+        "raw_app_dir": os.path.abspath(app_dir),
+        "chain_images": cfg.chain_images,
+        "stat": dict(stat),
+    }
+    if empty:
+        manifest["empty"] = True
+    safe_mkdir(out_app)
+    write_json(manifest, os.path.join(out_app, MANIFEST_FILENAME))
+
 # =========================================================
 # Main
 # =========================================================
 
-def process_raw_root(raw_root: str, dst_root: str):
-    safe_mkdir(dst_root)
+def process_app(
+    app_dir: str,
+    out_app: str,
+    cfg: Optional[Phase2Config] = None,
+    show_progress: bool = True,
+) -> Dict[str, int]:
+    """Process one raw app dir into out_app and return its stat counters."""
+    cfg = cfg or Phase2Config()
     stat = defaultdict(int)
-    ocr_cache: Dict[str, str] = {}
-    enrich_cache: Dict[str, List[Dict[str, Any]]] = {}
-
-    for app in tqdm(sorted(os.listdir(raw_root)), desc="APKs"):
-        app_dir = os.path.join(raw_root, app)
-        if not os.path.isdir(app_dir):
-            continue
 
-        tp = os.path.join(app_dir, "tupleOfPermissions.json")
-        if not os.path.exists(tp):
-            continue
+    tp = os.path.join(app_dir, "tupleOfPermissions.json")
+    if not os.path.exists(tp):
+        return dict(stat)
 
+    timer = _STAGE_TIMER
+    with timer.stage("index"):
+        # Snapshot before reading so a change made mid-run forces the next rerun.
+        inputs = app_input_digest(app_dir)
         raw = read_json(tp)
         if not raw:
-            continue
-
+            # No outputs, but a manifest so incremental runs skip the app.
+            write_manifest(out_app, app_dir, inputs, cfg, stat, empty=True)
+            return dict(stat)
         steps, idx2png = build_step_index(app_dir)
 
-        result = []
-        new_tp = []
-        cid = 0
-
-        for seq in tqdm(raw, desc="chains", leave=False):
+    new_tp = []
+    with timer.stage("repair"):
+        step_table = build_step_table(app_dir, idx2png, raw)
+        for seq in tqdm(raw, desc="chains", leave=False, disable=not show_progress):
             stat["total"] += 1
-            repaired = repair_chain(app_dir, steps, idx2png, seq)
+            repaired = repair_chain(step_table, idx2png, seq)
             if repaired is None:
                 stat["removed"] += 1
                 continue
-
             stat["kept"] += 1
-
-            def build_entry(p):
-                img = os.path.join(app_dir, p)
-                xml = img.replace(".png", ".xml")
-                if img not in ocr_cache:
-                    ocr_cache[img] = ocr_image(img)
-                if xml not in enrich_cache:
-                    enrich_cache[xml] = enrich_widgets(xml)
-                return {
-                    "file": p,
-                    "feature": {
-                        "text": ocr_cache[img],
-                        "widgets": [w.copy() for w in enrich_cache[xml]],
-                    }
-                }
-
-            item = {
-                "chain_id": cid,
-                "ui_before_grant": build_entry(repaired[0]),
-                "ui_granting": [build_entry(p) for p in repaired[1:-1]],
-                "ui_after_grant": build_entry(repaired[-1]),
-            }
-
-            result.append(item)
             new_tp.append(repaired)
-            cid += 1
-
-        if not result:
-            continue
 
-        out_app = os.path.join(dst_root, app)
-        safe_mkdir(out_app)
-
-        for i, chain in enumerate(new_tp):
-            imgs = [os.path.join(app_dir, p) for p in chain]
-            merge_images(imgs, os.path.join(out_app, f"chain_{i}.png"))
+    if not new_tp:
+        write_manifest(out_app, app_dir, inputs, cfg, stat, empty=True)
+        return dict(stat)
 
+    step_files = list(dict.fromkeys(p for chain in new_tp for p in chain))
+    stat["steps"] += len(step_files)
+    ocr_decisions: List[Dict[str, Any]] = []
+    enrich_cache: Dict[str, List[Dict[str, Any]]] = {}
+    cache_path = resolve_cache_path(cfg, os.path.dirname(out_app))
+    store = Phase2Cache(cache_path) if cache_path else None
+    step_paths = [os.path.join(app_dir, p) for p in step_files]
+    if cfg.dedupe:
+        with timer.stage("dedupe"):
+            canon = dedupe_steps(step_paths, cfg.dedupe_max_distance, stat)
+    else:
+        canon = {p: p for p in step_paths}
+    try:
+        with timer.stage("ocr"):
+            unique = list(dict.fromkeys(canon.values()))
+            ocr_texts = ocr_app_images(unique, cfg, stat, store, decisions=ocr_decisions)
+            for img in step_paths:
+                ocr_texts[img] = ocr_texts[canon[img]]
+        with timer.stage("enrich"):
+            for img in step_paths:
+                xml = img.replace(".png", ".xml")
+                enrich_cache[xml] = retain_widgets(cached_enrich_widgets(xml, stat, store), cfg)
+    finally:
+        if store is not None:
+            store.close()
+
+    def build_feature(p):
+        img = os.path.join(app_dir, p)
+        return {
+            "text": ocr_texts[img],
+            # Shared across entries of the same step; serialized straight to JSON.
+            "widgets": enrich_cache[img.replace(".png", ".xml")],
+        }
+
+    if cfg.result_format == "screens":
+        def build_entry(p):
+            return {"file": p}
+    else:
+        def build_entry(p):
+            return {"file": p, "feature": build_feature(p)}
+
+    result: Any = [
+        {
+            "chain_id": cid,
+            "ui_before_grant": build_entry(repaired[0]),
+            "ui_granting": [build_entry(p) for p in repaired[1:-1]],
+            "ui_after_grant": build_entry(repaired[-1]),
+        }
+        for cid, repaired in enumerate(new_tp)
+    ]
+    if cfg.result_format == "screens":
+        result = {
+            "format": SCREEN_STORE_FORMAT,
+            "widget_retention": widget_retention(cfg),
+            "screens": {p: build_feature(p) for p in step_files},
+            "chains": result,
+        }
+
+    safe_mkdir(out_app)
+    # A run that dies half way must not leave a manifest vouching for old outputs.
+    manifest_path = os.path.join(out_app, MANIFEST_FILENAME)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+    with timer.stage("merge"):
+        if cfg.chain_images == "lazy":
+            # Renders from an earlier run may belong to different chains now.
+            for name in os.listdir(out_app):
+                if CHAIN_IMAGE_RE.match(name):
+                    os.remove(os.path.join(out_app, name))
+        else:
+            decoded = LRUCache(DECODED_IMAGE_CACHE_SIZE)
+            for i, chain in enumerate(new_tp):
+                imgs = [canon[os.path.join(app_dir, p)] for p in chain]
+                merge_images(imgs, os.path.join(out_app, chain_image_name(i)), decoded)
+            _merge_stat(stat, decoded.drain_stats("frame_cache"))
+            decoded.clear()
+
+    with timer.stage("write"):
         write_json(result, os.path.join(out_app, "result.json"))
         write_json(new_tp, os.path.join(out_app, "tupleOfPermissions.json"))
+        if cfg.ocr_policy == "widget_first":
+            write_json(ocr_decisions, os.path.join(out_app, OCR_DECISIONS_FILENAME))
+        write_manifest(out_app, app_dir, inputs, cfg, stat)
+    return dict(stat)
+
+
+def _init_worker():
+    # N workers x multi-threaded tesseract/OpenCV would oversubscribe the cores.
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+    cv2.setNumThreads(1)
+
 
-    write_json(dict(stat), os.path.join(dst_root, "summary.json"))
-    print("DONE:", dict(stat))
+def _process_app_task(task: Tuple[str, str, Phase2Config], show_progress: bool = False) -> Dict[str, int]:
+    app_dir, out_app, cfg = task
+    ts = time.perf_counter()
+    try:
+        app_stat = defaultdict(int, process_app(app_dir, out_app, cfg, show_progress=show_progress))
+    finally:
+        # Parsed widget tables are only reused within one app.
+        _WIDGET_PARSE_CACHE.clear()
+    _merge_stat(app_stat, _WIDGET_PARSE_CACHE.drain_stats("widget_cache"))
+    _merge_stat(app_stat, _STAGE_TIMER.drain_stats())
+    app_stat["time_app_s"] = time.perf_counter() - ts
+    app_stat["peak_rss_kb"] = peak_rss_kb()
+    return dict(app_stat)
+
+
+# Stat keys combined with max() instead of summed across apps/workers.
+_MAX_STATS = ("peak_rss_kb",)
+# Stat keys replayed from the manifest of an unchanged app.
+_CORPUS_STATS = ("total", "kept", "removed", "steps")
+
+
+def _merge_stat(stat: Dict[str, int], app_stat: Dict[str, int]):
+    for k, v in app_stat.items():
+        if k in _MAX_STATS:
+            stat[k] = max(stat.get(k, 0), v)
+        else:
+            stat[k] += v
+
+
+def _rate(n: float, seconds: float) -> float:
+    return round(n / seconds, 3) if seconds > 0 else 0.0
+
+
+def _trace_record(app: str, app_stat: Dict[str, Any]) -> Dict[str, Any]:
+    rec: Dict[str, Any] = {"app": app}
+    for k, v in app_stat.items():
+        rec[k] = round(v, 4) if isinstance(v, float) else v
+    seconds = app_stat.get("time_app_s", 0.0)
+    rec["images_per_s"] = _rate(app_stat.get("steps", 0), seconds)
+    rec["chains_per_s"] = _rate(app_stat.get("kept", 0), seconds)
+    return rec
+
+
+def validate_config(cfg: Phase2Config):
+    if cfg.ocr_mode not in OCR_MODES:
+        raise ValueError(f"unknown ocr_mode: {cfg.ocr_mode}")
+    if cfg.ocr_backend not in OCR_BACKENDS:
+        raise ValueError(f"unknown ocr_backend: {cfg.ocr_backend}")
+    if cfg.ocr_policy not in OCR_POLICIES:
+        raise ValueError(f"unknown ocr_policy: {cfg.ocr_policy}")
+    if cfg.result_format not in RESULT_FORMATS:
+        raise ValueError(f"unknown result_format: {cfg.result_format}")
+    if cfg.chain_images not in CHAIN_IMAGE_MODES:
+        raise ValueError(f"unknown chain_images: {cfg.chain_images}")
+
+
+class Phase2Run:
+    """
+    Counters, trace and summary.json of one phase2 run. Apps are fed either
+    as a whole raw root (process_raw_root) or one at a time as phase1 pulls
+    them (streaming `full` mode); the summary is the same either way.
+    """
+
+    def __init__(self, dst_root: str, cfg: Optional[Phase2Config] = None, force: bool = False, trace_path: str = ""):
+        self.dst_root = dst_root
+        self.cfg = cfg or Phase2Config()
+        self.force = force
+        validate_config(self.cfg)
+        safe_mkdir(dst_root)
+        self.stat = defaultdict(int)
+        # Throughput counts only apps processed in this run, not manifest replays.
+        self.done = defaultdict(int)
+        self.apps = set()
+        self._start = time.perf_counter()
+        self._trace = None
+        if trace_path:
+            safe_mkdir(os.path.dirname(os.path.abspath(trace_path)))
+            self._trace = open(trace_path, "a", encoding="utf-8")
+
+        cache_path = resolve_cache_path(self.cfg, dst_root)
+        if cache_path:
+            # Create the schema and switch to WAL before workers race to do it:
+            # concurrent journal_mode changes fail with "database is locked".
+            Phase2Cache(cache_path).close()
+
+    def _write_trace(self, rec: Dict[str, Any]):
+        if self._trace is not None:
+            self._trace.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            self._trace.flush()
+
+    def plan(self, app_dir: str) -> Optional[Tuple[str, str, Phase2Config]]:
+        """Task for app_dir, or None when its manifest is current (counters replayed)."""
+        app = os.path.basename(os.path.normpath(app_dir))
+        self.apps.add(app)
+        out_app = os.path.join(self.dst_root, app)
+        manifest = None if self.force else load_current_manifest(app_dir, out_app, self.cfg)
+        if manifest is not None:
+            # Replay only the corpus totals, so summary.json still covers the whole
+            # corpus; OCR/cache/dedupe counters report work done in this run.
+            stored = manifest.get("stat") or {}
+            _merge_stat(self.stat, {k: stored[k] for k in _CORPUS_STATS if k in stored})
+            self.stat["apps_unchanged"] += 1
+            self._write_trace({"app": app, "unchanged": True})
+            return None
+        return (app_dir, out_app, self.cfg)
+
+    def finish(self, task: Tuple[str, str, Phase2Config], app_stat: Dict[str, Any]):
+        _merge_stat(self.stat, app_stat)
+        self.done["steps"] += app_stat.get("steps", 0)
+        self.done["kept"] += app_stat.get("kept", 0)
+        self._write_trace(_trace_record(os.path.basename(task[0]), app_stat))
+
+    def process_app(self, app_dir: str) -> str:
+        """Process one raw app dir in this process; returns its processed dir."""
+        task = self.plan(app_dir)
+        if task is not None:
+            self.finish(task, _process_app_task(task))
+        return os.path.join(self.dst_root, os.path.basename(os.path.normpath(app_dir)))
+
+    def close(self):
+        if self._trace is not None:
+            self._trace.close()
+            self._trace = None
+
+    def write_summary(self) -> Dict[str, Any]:
+        stat, done = self.stat, self.done
+        # Serial runs report the main process; with workers, the largest worker.
+        _merge_stat(stat, {"peak_rss_kb": peak_rss_kb()})
+        wall = time.perf_counter() - self._start
+        summary: Dict[str, Any] = {
+            k: round(v, 3) if isinstance(v, float) else v for k, v in stat.items()
+        }
+        if stat.get("dedupe_steps"):
+            summary["dedupe_ratio"] = round(stat["dedupe_duplicates"] / stat["dedupe_steps"], 4)
+        summary["wall_s"] = round(wall, 3)
+        summary["images_per_s"] = _rate(done["steps"], wall)
+        summary["chains_per_s"] = _rate(done["kept"], wall)
+        summary["ocr_images_per_s"] = _rate(stat.get("ocr_images", 0), stat.get("time_ocr_s", 0.0))
+        write_json(summary, os.path.join(self.dst_root, "summary.json"))
+        print("DONE:", summary)
+        return summary
+
+
+def process_raw_root(
+    raw_root: str,
+    dst_root: str,
+    workers: int = 1,
+    cfg: Optional[Phase2Config] = None,
+    force: bool = False,
+    trace_path: str = "",
+    run: Optional[Phase2Run] = None,
+):
+    """
+    trace_path: optional JSONL file, one record per app with its stage
+    timings and counters.
+    run: continue a Phase2Run that already processed some apps one by one;
+    those apps are not planned again.
+    """
+    run = run or Phase2Run(dst_root, cfg, force=force, trace_path=trace_path)
+    try:
+        tasks = []
+        for app in sorted(os.listdir(raw_root)):
+            app_dir = os.path.join(raw_root, app)
+            if not os.path.isdir(app_dir) or app in run.apps:
+                continue
+            task = run.plan(app_dir)
+            if task is not None:
+                tasks.append(task)
+
+        if workers <= 1:
+            for task in tqdm(tasks, desc="APKs"):
+                run.finish(task, _process_app_task(task, show_progress=True))
+        else:
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+            try:
+                futures = {executor.submit(_process_app_task, task): task for task in tasks}
+                for fut in tqdm(as_completed(futures), total=len(futures), desc=f"APKs(workers={workers})"):
+                    run.finish(futures[fut], fut.result())
+            except BaseException:
+                executor.shutdown(wait=True, cancel_futures=True)
+                raise
+            executor.shutdown(wait=True)
+    finally:
+        run.close()
+    return run.write_summary()
 
 
 def main():
@@ -414,9 +1493,39 @@ def main():
     parser = argparse.ArgumentParser(description="Process raw fastbot outputs into structured chains.")
     parser.add_argument("--raw-root", default=os.getenv("LLMMUI_RAW_DIR", os.getenv("DATA_RAW_DIR", RAW_ROOT)))
     parser.add_argument("--dst-root", default=os.getenv("LLMMUI_PROCESSED_DIR", os.getenv("DATA_PROCESSED_DIR", DST_ROOT)))
+    parser.add_argument("--workers", type=int, default=settings.PHASE2_WORKERS, help="number of app worker processes")
+    parser.add_argument("--ocr-mode", choices=OCR_MODES, default=settings.PHASE2_OCR_MODE)
+    parser.add_argument("--ocr-backend", choices=OCR_BACKENDS, default=settings.PHASE2_OCR_BACKEND)
+    parser.add_argument("--ocr-batch-size", type=int, default=settings.PHASE2_OCR_BATCH_SIZE, help="images per tesseract process (batch backend)")
+    parser.add_argument("--ocr-roi", action="store_true", default=settings.PHASE2_OCR_ROI, help="OCR only the dialog/content region given by the XML bounds")
+    parser.add_argument("--ocr-policy", choices=OCR_POLICIES, default=settings.PHASE2_OCR_POLICY)
+    parser.add_argument("--result-format", choices=RESULT_FORMATS, default=settings.PHASE2_RESULT_FORMAT, help="screens: store each screen once per app")
+    parser.add_argument("--widget-top-k", type=int, default=settings.PHASE2_WIDGET_TOP_K, help="0 keeps all widgets")
+    parser.add_argument("--widget-score-floor", type=float, default=settings.PHASE2_WIDGET_SCORE_FLOOR)
+    parser.add_argument("--dedupe", action="store_true", default=settings.PHASE2_DEDUPE, help="share OCR and decoded images between near-identical steps")
+    parser.add_argument("--dedupe-max-distance", type=int, default=settings.PHASE2_DEDUPE_MAX_DISTANCE, help="max dHash hamming distance (bits of 64)")
+    parser.add_argument("--chain-images", choices=CHAIN_IMAGE_MODES, default=settings.PHASE2_CHAIN_IMAGES, help="lazy: render chain_*.png on demand (data_pipline.chain_render)")
+    parser.add_argument("--cache-path", default=settings.PHASE2_CACHE_PATH, help='OCR/widget cache sqlite, "auto" or "off"')
+    parser.add_argument("--no-cache", action="store_true", help="disable the persistent OCR/widget cache")
+    parser.add_argument("--force", action="store_true", help="reprocess apps whose manifest says inputs are unchanged")
+    parser.add_argument("--trace", default=settings.PHASE2_TRACE_PATH, help="append per-app stage timings to this JSONL file")
     args = parser.parse_args()
 
-    process_raw_root(args.raw_root, args.dst_root)
+    cfg = Phase2Config(
+        ocr_mode=args.ocr_mode,
+        ocr_backend=args.ocr_backend,
+        ocr_batch_size=args.ocr_batch_size,
+        ocr_roi=args.ocr_roi,
+        ocr_policy=args.ocr_policy,
+        result_format=args.result_format,
+        widget_top_k=args.widget_top_k,
+        widget_score_floor=args.widget_score_floor,
+        dedupe=args.dedupe,
+        dedupe_max_distance=args.dedupe_max_distance,
+        chain_images=args.chain_images,
+        cache_path="off" if args.no_cache else args.cache_path,
+    )
+    process_raw_root(args.raw_root, args.dst_root, workers=args.workers, cfg=cfg, force=args.force, trace_path=args.trace)
 
 if __name__ == "__main__":
     main()
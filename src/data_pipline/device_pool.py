@@ -0,0 +1,115 @@
+"""
+Phase1 device pool.
+
+Finds the devices/emulators phase1 may use and fans APKs out to them: one
+worker per device, each taking the next APK from a shared queue as soon as
+its device is idle. All adb invocations go through `adb_command`, so the
+serial reaches every shell/pull/install call and `LLMMUI_ADB_BIN` can point
+at scripts/test/fake_adb.py on hosts without devices.
+"""
+
+import queue
+import shlex
+import subprocess
+import threading
+from typing import Callable, List, Optional, Sequence, TypeVar
+
+from configs import settings
+
+T = TypeVar("T")
+
+
+def adb_command(serial: Optional[str], *args: str) -> List[str]:
+    cmd = shlex.split(settings.ADB_BIN)
+    if serial:
+        cmd += ["-s", serial]
+    return cmd + list(args)
+
+
+def list_devices() -> List[str]:
+    """Serials of attached devices in the `device` state (offline/unauthorized are skipped)."""
+    proc = subprocess.run(
+        adb_command(None, "devices"),
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        errors="ignore",
+        timeout=30,
+        check=True,
+    )
+    serials = []
+    for line in proc.stdout.splitlines():
+        parts = line.split()
+        if len(parts) >= 2 and parts[1] == "device":
+            serials.append(parts[0])
+    return serials
+
+
+def resolve_devices(spec: str = "") -> List[Optional[str]]:
+    """
+    spec: "" -> adb's default device (single-device behaviour),
+          "all" -> every attached device, "s1,s2" -> these serials.
+    """
+    spec = (spec or "").strip()
+    if not spec:
+        return [None]
+    if spec.lower() == "all":
+        serials = list_devices()
+        if not serials:
+            raise RuntimeError("no adb devices attached")
+        return list(serials)
+    return [s.strip() for s in spec.split(",") if s.strip()]
+
+
+def device_label(serial: Optional[str]) -> str:
+    return serial or "default"
+
+
+def run_on_devices(
+    items: Sequence[T],
+    devices: Sequence[Optional[str]],
+    worker: Callable[[T, Optional[str]], None],
+) -> None:
+    """
+    Run worker(item, serial) for every item, one item at a time per device.
+    worker does its own per-item error handling; an exception escaping it
+    stops all devices from taking new items and is re-raised here.
+    """
+    pending: "queue.Queue[T]" = queue.Queue()
+    for item in items:
+        pending.put(item)
+    stop = threading.Event()
+    errors: List[BaseException] = []
+
+    def loop(serial: Optional[str]) -> None:
+        while not stop.is_set():
+            try:
+                item = pending.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                worker(item, serial)
+            except BaseException as exc:
+                errors.append(exc)
+                stop.set()
+                return
+
+    if len(devices) <= 1:
+        # Keep the single-device path on the main thread (Ctrl-C, tracebacks).
+        loop(devices[0] if devices else None)
+    else:
+        threads = [
+            threading.Thread(target=loop, args=(serial,), name=f"phase1-{device_label(serial)}", daemon=True)
+            for serial in devices
+        ]
+        for t in threads:
+            t.start()
+        try:
+            for t in threads:
+                while t.is_alive():
+                    t.join(0.5)
+        except KeyboardInterrupt:
+            stop.set()
+            raise
+    if errors:
+        raise errors[0]
@@ -0,0 +1,79 @@
+"""
+Persistent, content-addressed cache for phase2 OCR / widget enrichment.
+
+Entries are keyed by (kind, sha1(file bytes) + parameter version), so a
+rerun only pays for screenshots/XML that are new or changed, and bumping
+a version string (new preprocessing, new scoring word list) invalidates
+exactly the affected kind.
+
+One SQLite file is shared by all phase2 worker processes; each process
+opens its own connection and writes in short batched transactions.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_CACHE_FILENAME = ".phase2_cache.sqlite"
+_FLUSH_EVERY = 64
+
+
+def file_digest(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class Phase2Cache:
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=60)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "kind TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+            "PRIMARY KEY (kind, key))"
+        )
+        self._conn.commit()
+        self._pending: Dict[Tuple[str, str], str] = {}
+
+    def get(self, kind: str, key: str) -> Optional[Any]:
+        raw = self._pending.get((kind, key))
+        if raw is None:
+            row = self._conn.execute(
+                "SELECT value FROM entries WHERE kind = ? AND key = ?", (kind, key)
+            ).fetchone()
+            if row is None:
+                return None
+            raw = row[0]
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return None
+
+    def put(self, kind: str, key: str, value: Any):
+        self._pending[(kind, key)] = json.dumps(value, ensure_ascii=False)
+        if len(self._pending) >= _FLUSH_EVERY:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        rows = [(k, key, v) for (k, key), v in self._pending.items()]
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (kind, key, value) VALUES (?, ?, ?)", rows
+            )
+        self._pending.clear()
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self._conn.close()
@@ -0,0 +1,47 @@
+"""
+Fastbot step file naming shared by phase1 (selective pull) and phase2.
+
+Kept free of OCR/CV imports so phase1 can decide which steps to pull from
+the device without loading the phase2 stack.
+"""
+
+import re
+from typing import Iterable, List, Optional, Set
+
+STEP_RE = re.compile(r"step-(\d+)-.*\.png$")
+# repair_chain looks at most this many steps before/after a permission tuple.
+REPAIR_WINDOW = 3
+TUPLE_FILENAME = "tupleOfPermissions.json"
+
+
+def step_number(name: str) -> Optional[int]:
+    m = STEP_RE.match(name)
+    return int(m.group(1)) if m else None
+
+
+def repair_window_files(names: Iterable[str], seqs) -> List[str]:
+    """
+    Files phase2 can read for these tuples: the tuple json plus png/xml of
+    every step in [first - REPAIR_WINDOW, last + REPAIR_WINDOW] of each tuple.
+    """
+    names = list(names)
+    wanted: Set[int] = set()
+    for seq in seqs if isinstance(seqs, list) else []:
+        if not isinstance(seq, list) or not seq:
+            continue
+        first, last = step_number(str(seq[0])), step_number(str(seq[-1]))
+        if first is None or last is None:
+            continue
+        wanted.update(range(first - REPAIR_WINDOW, last + REPAIR_WINDOW + 1))
+
+    stems = set()
+    for name in names:
+        n = step_number(name)
+        if n is not None and n in wanted:
+            stems.add(name[: -len(".png")])
+    out = [TUPLE_FILENAME] if TUPLE_FILENAME in names else []
+    out += sorted(
+        name for name in names
+        if name.endswith((".png", ".xml")) and name.rsplit(".", 1)[0] in stems
+    )
+    return out
@@ -2,7 +2,7 @@
 """
 Unified entrypoint for llmui.
 Modes:
-  - full       : phase1 + phase2 + phase3_v2
+  - full       : phase1 + phase2 + phase3_v2 (--stream: per app, overlapped with phase1)
   - phase1     : data collect
   - phase2     : data process
   - phase3_v2  : permission + semantic_v2 + retrieved_knowledge + llm + final
@@ -16,7 +16,7 @@ import os
 import sys
 import traceback
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if ROOT not in sys.path:
@@ -29,6 +29,10 @@ from analy_pipline.scene import run_chain_semantic_interpreter
 from analy_pipline.permission import run_permission_rule
 from analy_pipline.judge import run_llm_compliance
 from analy_pipline.judge.finalize_decision import FinalizeConfig, finalize_results_v2
+from analy_pipline.common.chain_scheduler import AppBatch, AppPipeline, ScheduleResult, run_app_batches, run_app_pipelines
+from utils.http_retry import pool_stats
+
+PHASE3_SCHEDULERS = ("app", "global", "pipeline")
 
 
 def list_valid_apks(directory: str) -> List[str]:
@@ -66,31 +70,58 @@ def _write_phase1_runlog(payload: dict) -> None:
         json.dump(payload, f, ensure_ascii=False, indent=2)
 
 
-def run_phase1(target: str) -> None:
+def run_phase1(target: str, devices: str = "", on_app_done: Optional[Callable[[str], None]] = None) -> None:
+    """on_app_done(raw_app_dir) is called from the device worker once an app's output is pulled (or already there)."""
+    import threading
+
     from data_pipline.data_collect import DataCollectAgent
+    from data_pipline.device_pool import device_label, resolve_devices, run_on_devices
+
+    serials = resolve_devices(devices or settings.PHASE1_DEVICES)
 
     if os.path.isdir(target):
         apk_files = list_valid_apks(target)
         print(f"[INFO] Found {len(apk_files)} APKs.")
+        if len(serials) > 1:
+            print(f"[INFO] Phase1 devices: {', '.join(device_label(s) for s in serials)}")
         started_at = datetime.now()
-        _write_phase1_checkpoint(
-            {
-                "status": "running",
-                "target": target,
-                "total_apks": len(apk_files),
+        lock = threading.Lock()
+        failed = []
+        state = {"current_index": 0, "current_apk": "", "last_success_apk": ""}
+        device_state = {
+            device_label(serial): {
                 "current_index": 0,
                 "current_apk": "",
                 "last_success_apk": "",
-                "failed_count": 0,
-                "failures": [],
+                "finished": 0,
+                "failed": 0,
             }
-        )
+            for serial in serials
+        }
+
+        def checkpoint(status: str) -> None:
+            _write_phase1_checkpoint(
+                {
+                    "status": status,
+                    "target": target,
+                    "total_apks": len(apk_files),
+                    "current_index": state["current_index"],
+                    "current_apk": state["current_apk"],
+                    "last_success_apk": state["last_success_apk"],
+                    "failed_count": len(failed),
+                    "failures": failed,
+                    "devices": device_state,
+                }
+            )
+
+        checkpoint("running")
         runlog = {
             "run_id": settings.RUN_ID,
             "status": "running",
             "target": target,
             "time_limit_minutes": settings.TIME_LIMIT,
             "total_apks": len(apk_files),
+            "devices": [device_label(s) for s in serials],
             "started_at": started_at.isoformat(timespec="seconds"),
             "finished_at": "",
             "summary": {
@@ -100,116 +131,110 @@ def run_phase1(target: str) -> None:
                 "failed": 0,
             },
             "failed_apks": [],
+            # Totals over the APKs actually pulled in this run (skipped ones excluded).
+            "pull": {
+                "mode": settings.PHASE1_PULL_MODE,
+                "selective": settings.PHASE1_PULL_SELECTIVE,
+                "apks": 0,
+                "seconds": 0.0,
+                "bytes": 0,
+                "files": 0,
+            },
+            "fastbot": {"budget": settings.FASTBOT_BUDGET, "apks": 0, "seconds": 0.0, "stopped_early": 0},
             "records": [],
         }
-        failed = []
-        last_success_apk = ""
-        for idx, apk in enumerate(apk_files, 1):
+
+        def run_one(item, serial) -> None:
+            idx, apk = item
+            device = device_label(serial)
+            dev = device_state[device]
             full_apk_path = os.path.join(target, apk)
             item_started = datetime.now()
-            print(f"[INFO] Phase1 {idx}/{len(apk_files)} -> {apk}")
-            _write_phase1_checkpoint(
-                {
-                    "status": "running",
-                    "target": target,
-                    "total_apks": len(apk_files),
-                    "current_index": idx,
-                    "current_apk": apk,
-                    "last_success_apk": last_success_apk,
-                    "failed_count": len(failed),
-                    "failures": failed,
-                }
-            )
+            tag = f" [{device}]" if len(serials) > 1 else ""
+            print(f"[INFO] Phase1 {idx}/{len(apk_files)}{tag} -> {apk}")
+            with lock:
+                state["current_index"], state["current_apk"] = idx, apk
+                dev["current_index"], dev["current_apk"] = idx, apk
+                checkpoint("running")
             try:
-                result = DataCollectAgent(full_apk_path, time=settings.TIME_LIMIT).run(skip_if_result_exist=True)
+                agent = DataCollectAgent(full_apk_path, time=settings.TIME_LIMIT, serial=serial)
+                result = agent.run(skip_if_result_exist=True)
                 result = result or "success"
-                if result in ("success", "recovered_with_output"):
-                    last_success_apk = apk
-                if result not in runlog["summary"]:
-                    result = "success"
-                runlog["summary"][result] += 1
-                runlog["records"].append(
-                    {
+                with lock:
+                    if result in ("success", "recovered_with_output"):
+                        state["last_success_apk"] = apk
+                        dev["last_success_apk"] = apk
+                    if result not in runlog["summary"]:
+                        result = "success"
+                    runlog["summary"][result] += 1
+                    dev["finished"] += 1
+                    record = {
                         "index": idx,
                         "apk": apk,
+                        "device": device,
                         "status": result,
                         "started_at": item_started.isoformat(timespec="seconds"),
                         "finished_at": datetime.now().isoformat(timespec="seconds"),
                     }
-                )
-                _write_phase1_checkpoint(
-                    {
-                        "status": "running",
-                        "target": target,
-                        "total_apks": len(apk_files),
-                        "current_index": idx,
-                        "current_apk": apk,
-                        "last_success_apk": last_success_apk,
-                        "failed_count": len(failed),
-                        "failures": failed,
-                    }
-                )
+                    if agent.pull_stats:
+                        record["pull"] = agent.pull_stats
+                        totals = runlog["pull"]
+                        totals["apks"] += 1
+                        totals["seconds"] = round(totals["seconds"] + agent.pull_stats["seconds"], 3)
+                        for k in ("bytes", "files"):
+                            totals[k] += agent.pull_stats[k]
+                    if agent.fastbot_stats.get("seconds") is not None:
+                        record["fastbot"] = agent.fastbot_stats
+                        totals = runlog["fastbot"]
+                        totals["apks"] += 1
+                        totals["seconds"] = round(totals["seconds"] + agent.fastbot_stats["seconds"], 3)
+                        totals["stopped_early"] += int(agent.fastbot_stats.get("stopped_early", False))
+                    runlog["records"].append(record)
+                    checkpoint("running")
+                if on_app_done is not None:
+                    on_app_done(os.path.join(agent.output_dir, agent.fastbot_output_dir))
             except KeyboardInterrupt:
+                raise
+            except Exception as exc:
+                with lock:
+                    failed.append({"apk": apk, "device": device, "error": str(exc)})
+                    runlog["summary"]["failed"] += 1
+                    dev["finished"] += 1
+                    dev["failed"] += 1
+                    runlog["failed_apks"].append({"apk": apk, "device": device, "error": str(exc)})
+                    runlog["records"].append(
+                        {
+                            "index": idx,
+                            "apk": apk,
+                            "device": device,
+                            "status": "failed",
+                            "error": str(exc),
+                            "started_at": item_started.isoformat(timespec="seconds"),
+                            "finished_at": datetime.now().isoformat(timespec="seconds"),
+                        }
+                    )
+                    print(f"[WARN] Phase1 failed for {apk}{tag}: {exc}")
+                    traceback.print_exc()
+                    checkpoint("running")
+
+        try:
+            run_on_devices(list(enumerate(apk_files, 1)), serials, run_one)
+        except KeyboardInterrupt:
+            with lock:
                 runlog["status"] = "interrupted"
                 runlog["finished_at"] = datetime.now().isoformat(timespec="seconds")
                 _write_phase1_runlog(runlog)
-                _write_phase1_checkpoint(
-                    {
-                        "status": "interrupted",
-                        "target": target,
-                        "total_apks": len(apk_files),
-                        "current_index": idx,
-                        "current_apk": apk,
-                        "last_success_apk": last_success_apk,
-                        "failed_count": len(failed),
-                        "failures": failed,
-                    }
-                )
-                raise
-            except Exception as exc:
-                failed.append({"apk": apk, "error": str(exc)})
-                runlog["summary"]["failed"] += 1
-                runlog["failed_apks"].append({"apk": apk, "error": str(exc)})
-                runlog["records"].append(
-                    {
-                        "index": idx,
-                        "apk": apk,
-                        "status": "failed",
-                        "error": str(exc),
-                        "started_at": item_started.isoformat(timespec="seconds"),
-                        "finished_at": datetime.now().isoformat(timespec="seconds"),
-                    }
-                )
-                print(f"[WARN] Phase1 failed for {apk}: {exc}")
-                traceback.print_exc()
-                _write_phase1_checkpoint(
-                    {
-                        "status": "running",
-                        "target": target,
-                        "total_apks": len(apk_files),
-                        "current_index": idx,
-                        "current_apk": apk,
-                        "last_success_apk": last_success_apk,
-                        "failed_count": len(failed),
-                        "failures": failed,
-                    }
-                )
-                continue
+                checkpoint("interrupted")
+            raise
+
+        runlog["records"].sort(key=lambda r: r["index"])
         runlog["status"] = "done_with_failures" if failed else "done"
         runlog["finished_at"] = datetime.now().isoformat(timespec="seconds")
         _write_phase1_runlog(runlog)
-        _write_phase1_checkpoint(
-            {
-                "status": "done_with_failures" if failed else "done",
-                "target": target,
-                "total_apks": len(apk_files),
-                "current_index": len(apk_files),
-                "current_apk": "",
-                "last_success_apk": last_success_apk,
-                "failed_count": len(failed),
-                "failures": failed,
-            }
-        )
+        state["current_index"], state["current_apk"] = len(apk_files), ""
+        for dev in device_state.values():
+            dev["current_apk"] = ""
+        checkpoint("done_with_failures" if failed else "done")
         if failed:
             print(f"[WARN] Phase1 completed with {len(failed)} failures.")
             for item in failed:
@@ -217,13 +242,18 @@ def run_phase1(target: str) -> None:
         print(f"[INFO] Phase1 checkpoint: {_phase1_checkpoint_path()}")
         print(f"[INFO] Phase1 runlog: {_phase1_runlog_path()}")
     else:
-        DataCollectAgent(target, time=settings.TIME_LIMIT).run(skip_if_result_exist=True)
+        agent = DataCollectAgent(target, time=settings.TIME_LIMIT, serial=serials[0])
+        agent.run(skip_if_result_exist=True)
+        if on_app_done is not None:
+            on_app_done(os.path.join(agent.output_dir, agent.fastbot_output_dir))
 
 
-def run_phase2(raw_root: str, processed_root: str) -> None:
+def run_phase2(raw_root: str, processed_root: str, workers: int = 1, force: bool = False) -> None:
     from data_pipline import data_process
 
-    data_process.process_raw_root(raw_root, processed_root)
+    data_process.process_raw_root(
+        raw_root, processed_root, workers=workers, force=force, trace_path=settings.PHASE2_TRACE_PATH
+    )
 
 
 def _parse_chain_ids(raw: str) -> Optional[List[int]]:
@@ -311,70 +341,218 @@ def _run_apps_with_incremental(
     return stats
 
 
-def run_phase3_v2(processed_root: str, app_name: str, force: bool, chain_ids: Optional[List[int]]) -> Dict[str, Any]:
-    app_dirs = _resolve_phase3_app_dirs(processed_root, app_name=app_name)
-
-    permission_stats = _run_apps_with_incremental(
-        app_dirs,
-        output_filename="result_permission.json",
-        force=force,
-        runner=lambda app_dir: run_permission_rule.run(app_dir, chain_ids=chain_ids),
+def _phase3_v2_stages(chain_ids: Optional[List[int]]) -> List[Tuple[str, str, Callable[[str], Any]]]:
+    """(summary key, per-app output file, runner) for each phase3_v2 stage, in order."""
+    cfg = FinalizeConfig(
+        vllm_url=settings.VLLM_TEXT_URL,
+        vllm_model=settings.VLLM_TEXT_MODEL,
+        prompt_dir=PROMPT_DIR,
     )
+    return [
+        (
+            "permission_stage",
+            "result_permission.json",
+            lambda app_dir: run_permission_rule.run(app_dir, chain_ids=chain_ids),
+        ),
+        (
+            "semantic_v2_stage",
+            "result_semantic_v2.json",
+            lambda app_dir: run_chain_semantic_interpreter.run(
+                target=app_dir,
+                prompt_file=os.path.join(PROMPT_DIR, "chain_semantic_interpreter_vision.txt"),
+                vllm_url=settings.VLLM_VL_URL,
+                model=settings.VLLM_VL_MODEL,
+                output_filename="result_semantic_v2.json",
+                summary_filename="semantic_v2_summary.json",
+                schema_version="v2",
+                single_pass_only=True,
+                chain_ids=chain_ids,
+            ),
+        ),
+        (
+            "llm_v2_stage",
+            "result_llm_review.json",
+            lambda app_dir: run_llm_compliance.run_v2(
+                app_dir,
+                prompt_dir=PROMPT_DIR,
+                vllm_url=settings.VLLM_TEXT_URL,
+                model=settings.VLLM_TEXT_MODEL,
+                chain_ids=chain_ids,
+                semantic_filename="result_semantic_v2.json",
+                retrieval_output_filename="result_retrieved_knowledge.json",
+            ),
+        ),
+        (
+            "final_v2_stage",
+            "result_final_decision.json",
+            lambda app_dir: finalize_results_v2(app_dir, cfg, chain_ids=chain_ids),
+        ),
+    ]
 
-    semantic_stats = _run_apps_with_incremental(
-        app_dirs,
-        output_filename="result_semantic_v2.json",
-        force=force,
-        runner=lambda app_dir: run_chain_semantic_interpreter.run(
-            target=app_dir,
-            prompt_file=os.path.join(PROMPT_DIR, "chain_semantic_interpreter_vision.txt"),
+
+def _run_apps_scheduled(
+    app_dirs: List[str],
+    output_filename: str,
+    force: bool,
+    plan: Callable[[str], Optional[AppBatch]],
+    concurrency: int,
+    after: Optional[Callable[[ScheduleResult], None]] = None,
+) -> Dict[str, int]:
+    """_run_apps_with_incremental for per-chain stages: chains of all apps share one worker pool."""
+    stats = {"apps_total": len(app_dirs), "apps_run": 0, "apps_skipped": 0, "apps_failed": 0}
+    todo = []
+    for app_dir in app_dirs:
+        if not force and os.path.isfile(os.path.join(app_dir, output_filename)):
+            stats["apps_skipped"] += 1
+            print(f"[SKIP] app={app_dir} output exists: {output_filename}")
+            continue
+        todo.append(app_dir)
+    result = run_app_batches(todo, plan, concurrency, desc=output_filename)
+    stats["apps_run"] = len(result.done)
+    stats["apps_failed"] = len(result.failed)
+    if after is not None:
+        after(result)
+    return stats
+
+
+def _phase3_v2_chain_stage(key: str, processed_root: str, chain_ids: Optional[List[int]]):
+    """
+    (plan, concurrency, after) for the stages that make one LLM call per chain,
+    used by the global scheduler; None for stages that stay app by app.
+    """
+    if key == "semantic_v2_stage":
+        def write_semantic_summary(result: ScheduleResult) -> None:
+            finished = [v for v in result.done.values() if v is not None]
+            if not finished:
+                return
+            run_chain_semantic_interpreter.write_summary(
+                processed_root,
+                [rec for recs, _ in finished for rec in recs],
+                apps_processed=len(finished),
+                low_conf_count=sum(n for _, n in finished),
+                summary_filename="semantic_v2_summary.json",
+            )
+
+        plan = run_chain_semantic_interpreter.app_planner(
+            os.path.join(PROMPT_DIR, "chain_semantic_interpreter_vision.txt"),
             vllm_url=settings.VLLM_VL_URL,
             model=settings.VLLM_VL_MODEL,
             output_filename="result_semantic_v2.json",
-            summary_filename="semantic_v2_summary.json",
-            schema_version="v2",
             single_pass_only=True,
             chain_ids=chain_ids,
-        ),
-    )
-
-    llm_stats = _run_apps_with_incremental(
-        app_dirs,
-        output_filename="result_llm_review.json",
-        force=force,
-        runner=lambda app_dir: run_llm_compliance.run_v2(
-            app_dir,
-            prompt_dir=PROMPT_DIR,
+        )
+        return plan, settings.SEMANTIC_CONCURRENCY, write_semantic_summary
+    if key == "llm_v2_stage":
+        plan = run_llm_compliance.app_planner(
+            PROMPT_DIR,
             vllm_url=settings.VLLM_TEXT_URL,
             model=settings.VLLM_TEXT_MODEL,
             chain_ids=chain_ids,
             semantic_filename="result_semantic_v2.json",
             retrieval_output_filename="result_retrieved_knowledge.json",
-        ),
-    )
+        )
+        return plan, settings.COMPLIANCE_CONCURRENCY, None
+    return None
 
-    cfg = FinalizeConfig(
-        vllm_url=settings.VLLM_TEXT_URL,
-        vllm_model=settings.VLLM_TEXT_MODEL,
-        prompt_dir=PROMPT_DIR,
-    )
-    final_stats = _run_apps_with_incremental(
-        app_dirs,
-        output_filename="result_final_decision.json",
-        force=force,
-        runner=lambda app_dir: finalize_results_v2(app_dir, cfg, chain_ids=chain_ids),
-    )
 
+def _run_phase3_v2_stage(
+    key: str,
+    filename: str,
+    runner: Callable[[str], Any],
+    app_dirs: List[str],
+    processed_root: str,
+    force: bool,
+    chain_ids: Optional[List[int]],
+    scheduler: str,
+) -> Dict[str, int]:
+    if scheduler not in PHASE3_SCHEDULERS:
+        raise ValueError(f"unknown phase3 scheduler: {scheduler}")
+    chain_stage = _phase3_v2_chain_stage(key, processed_root, chain_ids) if scheduler != "app" else None
+    if chain_stage is None:
+        return _run_apps_with_incremental(app_dirs, output_filename=filename, force=force, runner=runner)
+    plan, concurrency, after = chain_stage
+    return _run_apps_scheduled(app_dirs, filename, force, plan, concurrency, after=after)
+
+
+def _run_semantic_llm_pipelined(
+    app_dirs: List[str],
+    processed_root: str,
+    force: bool,
+    chain_ids: Optional[List[int]],
+) -> Dict[str, Dict[str, int]]:
+    """
+    semantic_v2 + llm_v2 stages overlapped: each chain's compliance request is
+    sent as soon as its semantic record is back, so the VL and the text
+    endpoint work at the same time. Apps whose semantic output already exists
+    only run the compliance stage; skip rules are the same as stage by stage.
+    """
+    sem_stats = {"apps_total": len(app_dirs), "apps_run": 0, "apps_skipped": 0, "apps_failed": 0}
+    llm_stats = dict(sem_stats)
+    with_llm: Dict[str, bool] = {}
+    llm_only: List[str] = []
+    for app_dir in app_dirs:
+        has_sem = not force and os.path.isfile(os.path.join(app_dir, "result_semantic_v2.json"))
+        has_llm = not force and os.path.isfile(os.path.join(app_dir, "result_llm_review.json"))
+        for stats, filename, exists in ((sem_stats, "result_semantic_v2.json", has_sem), (llm_stats, "result_llm_review.json", has_llm)):
+            if exists:
+                stats["apps_skipped"] += 1
+                print(f"[SKIP] app={app_dir} output exists: {filename}")
+        if not has_sem:
+            with_llm[app_dir] = not has_llm
+        elif not has_llm:
+            llm_only.append(app_dir)
+
+    if with_llm:
+        sem_plan, sem_concurrency, write_semantic_summary = _phase3_v2_chain_stage("semantic_v2_stage", processed_root, chain_ids)
+        reviewer = run_llm_compliance.app_reviewer_factory(
+            PROMPT_DIR,
+            vllm_url=settings.VLLM_TEXT_URL,
+            model=settings.VLLM_TEXT_MODEL,
+            retrieval_output_filename="result_retrieved_knowledge.json",
+        )
+
+        no_chains: List[str] = []
+
+        def plan(app_dir: str) -> AppPipeline:
+            batch = sem_plan(app_dir)
+            if not with_llm[app_dir]:
+                return AppPipeline(first=batch, then=None)
+            if not batch.tasks:
+                # Nothing to review: like the other schedulers, write no llm output.
+                no_chains.append(app_dir)
+                return AppPipeline(first=batch, then=None)
+            prepare, finish = reviewer(app_dir)
+            return AppPipeline(first=batch, then=lambda rec: prepare(int(rec["chain_id"]), rec), finish=finish)
+
+        sem_result, llm_result = run_app_pipelines(
+            list(with_llm),
+            plan,
+            (sem_concurrency, settings.COMPLIANCE_CONCURRENCY),
+            desc="semantic+llm",
+        )
+        write_semantic_summary(sem_result)
+        sem_stats["apps_run"] = len(sem_result.done)
+        sem_stats["apps_failed"] = len(sem_result.failed)
+        llm_stats["apps_run"] = len(llm_result.done) + sum(1 for app_dir in no_chains if app_dir in sem_result.done)
+        llm_stats["apps_failed"] = len(llm_result.failed)
+
+    if llm_only:
+        llm_plan, llm_concurrency, _ = _phase3_v2_chain_stage("llm_v2_stage", processed_root, chain_ids)
+        stats = _run_apps_scheduled(llm_only, "result_llm_review.json", force, llm_plan, llm_concurrency)
+        llm_stats["apps_run"] += stats["apps_run"]
+        llm_stats["apps_failed"] += stats["apps_failed"]
+    return {"semantic_v2_stage": sem_stats, "llm_v2_stage": llm_stats}
+
+
+def _write_phase3_v2_summary(processed_root: str, app_dirs: List[str], stage_stats: Dict[str, Dict[str, int]]) -> Dict[str, Any]:
     summary = {
         "pipeline": "phase3_v2",
-        "permission_stage": permission_stats,
-        "semantic_v2_stage": semantic_stats,
-        "llm_v2_stage": llm_stats,
-        "final_v2_stage": final_stats,
+        **stage_stats,
         "total_semantic_v2_records": sum(len(_read_json_list(os.path.join(app_dir, "result_semantic_v2.json"))) for app_dir in app_dirs),
         "total_retrieval_records": sum(len(_read_json_list(os.path.join(app_dir, "result_retrieved_knowledge.json"))) for app_dir in app_dirs),
         "total_llm_records": sum(len(_read_json_list(os.path.join(app_dir, "result_llm_review.json"))) for app_dir in app_dirs),
         "total_final_records": sum(len(_read_json_list(os.path.join(app_dir, "result_final_decision.json"))) for app_dir in app_dirs),
+        "http_pool": pool_stats(),
     }
     summary_path = os.path.join(_summary_dir(processed_root), "phase3_v2_summary.json")
     _write_json(summary_path, summary)
@@ -382,13 +560,48 @@ def run_phase3_v2(processed_root: str, app_name: str, force: bool, chain_ids: Op
     return summary
 
 
-def run_phase3_v2_compliance(processed_root: str, app_name: str, force: bool, chain_ids: Optional[List[int]]) -> Dict[str, Any]:
+def _run_phase3_v2_stages(
+    app_dirs: List[str],
+    processed_root: str,
+    force: bool,
+    chain_ids: Optional[List[int]],
+    scheduler: str,
+) -> Dict[str, Dict[str, int]]:
+    stage_stats: Dict[str, Dict[str, int]] = {}
+    for key, filename, runner in _phase3_v2_stages(chain_ids):
+        if scheduler == "pipeline" and key == "semantic_v2_stage":
+            stage_stats.update(_run_semantic_llm_pipelined(app_dirs, processed_root, force, chain_ids))
+        elif scheduler == "pipeline" and key == "llm_v2_stage":
+            continue
+        else:
+            stage_stats[key] = _run_phase3_v2_stage(key, filename, runner, app_dirs, processed_root, force, chain_ids, scheduler)
+    return stage_stats
+
+
+def run_phase3_v2(
+    processed_root: str,
+    app_name: str,
+    force: bool,
+    chain_ids: Optional[List[int]],
+    scheduler: str = settings.PHASE3_SCHEDULER,
+) -> Dict[str, Any]:
     app_dirs = _resolve_phase3_app_dirs(processed_root, app_name=app_name)
-    llm_stats = _run_apps_with_incremental(
-        app_dirs,
-        output_filename="result_llm_review.json",
-        force=force,
-        runner=lambda app_dir: run_llm_compliance.run_v2(
+    stage_stats = _run_phase3_v2_stages(app_dirs, processed_root, force, chain_ids, scheduler)
+    return _write_phase3_v2_summary(processed_root, app_dirs, stage_stats)
+
+
+def run_phase3_v2_compliance(
+    processed_root: str,
+    app_name: str,
+    force: bool,
+    chain_ids: Optional[List[int]],
+    scheduler: str = settings.PHASE3_SCHEDULER,
+) -> Dict[str, Any]:
+    app_dirs = _resolve_phase3_app_dirs(processed_root, app_name=app_name)
+    llm_stats = _run_phase3_v2_stage(
+        "llm_v2_stage",
+        "result_llm_review.json",
+        lambda app_dir: run_llm_compliance.run_v2(
             app_dir,
             prompt_dir=PROMPT_DIR,
             vllm_url=settings.VLLM_TEXT_URL,
@@ -397,12 +610,18 @@ def run_phase3_v2_compliance(processed_root: str, app_name: str, force: bool, ch
             semantic_filename="result_semantic_v2.json",
             retrieval_output_filename="result_retrieved_knowledge.json",
         ),
+        app_dirs,
+        processed_root,
+        force,
+        chain_ids,
+        scheduler,
     )
     summary = {
         "pipeline": "phase3_v2_compliance",
         "llm_v2_stage": llm_stats,
         "total_retrieval_records": sum(len(_read_json_list(os.path.join(app_dir, "result_retrieved_knowledge.json"))) for app_dir in app_dirs),
         "total_llm_records": sum(len(_read_json_list(os.path.join(app_dir, "result_llm_review.json"))) for app_dir in app_dirs),
+        "http_pool": pool_stats(),
     }
     summary_path = os.path.join(_summary_dir(processed_root), "phase3_v2_compliance_summary.json")
     _write_json(summary_path, summary)
@@ -435,6 +654,108 @@ def run_phase3_v2_final(processed_root: str, app_name: str, force: bool, chain_i
     return summary
 
 
+def run_full_streaming(
+    target: str,
+    raw_root: str,
+    processed_root: str,
+    devices: str,
+    workers: int,
+    force: bool,
+    app_name: str,
+    chain_ids: Optional[List[int]],
+    scheduler: str = settings.PHASE3_SCHEDULER,
+) -> None:
+    """
+    `full` with the phases overlapped: every app phase1 pulls goes straight
+    through phase2 and then phase3_v2 while the devices move on to the next
+    APK. Once phase1 is done, apps that were already on disk are swept up the
+    same way as in the batch `full`, so summary.json / phase3_v2_summary.json
+    cover the same apps with the same counters. phase3_v2 stages run through
+    the same scheduler as `phase3_v2`.
+    """
+    import queue
+    import threading
+    import time
+
+    from data_pipline import data_process
+
+    started = time.perf_counter()
+    raw_root_abs = os.path.abspath(raw_root)
+    if scheduler not in PHASE3_SCHEDULERS:
+        raise ValueError(f"unknown phase3 scheduler: {scheduler}")
+    phase2 = data_process.Phase2Run(processed_root, force=force, trace_path=settings.PHASE2_TRACE_PATH)
+    stage_stats: Dict[str, Dict[str, int]] = {key: {} for key, _, _ in _phase3_v2_stages(chain_ids)}
+    streamed: set = set()
+    errors: List[BaseException] = []
+    phase2_q: "queue.Queue[Optional[str]]" = queue.Queue()
+    phase3_q: "queue.Queue[Optional[str]]" = queue.Queue()
+
+    def run_stages(app_dirs: List[str]) -> None:
+        for key, stats in _run_phase3_v2_stages(app_dirs, processed_root, force, chain_ids, scheduler).items():
+            for k, v in stats.items():
+                stage_stats[key][k] = stage_stats[key].get(k, 0) + v
+
+    def phase2_loop() -> None:
+        while True:
+            raw_app_dir = phase2_q.get()
+            if raw_app_dir is None:
+                phase3_q.put(None)
+                return
+            if errors:
+                continue
+            try:
+                phase3_q.put(phase2.process_app(raw_app_dir))
+            except Exception as exc:
+                # Same outcome as batch mode (phase2 aborts), reported after phase1.
+                print(f"[WARN] phase2 failed app={raw_app_dir}: {exc}")
+                traceback.print_exc()
+                errors.append(exc)
+
+    def phase3_loop() -> None:
+        while True:
+            app_dir = phase3_q.get()
+            if app_dir is None:
+                return
+            if errors or not _resolve_phase3_app_dirs(app_dir, app_name=app_name):
+                continue
+            try:
+                run_stages([app_dir])
+            except Exception as exc:
+                # Same outcome as batch mode (phase3_v2 aborts), reported after phase1.
+                print(f"[WARN] phase3_v2 failed app={app_dir}: {exc}")
+                traceback.print_exc()
+                errors.append(exc)
+                continue
+            streamed.add(app_dir)
+            print(f"[STREAM] app={os.path.basename(app_dir)} done after {time.perf_counter() - started:.0f}s")
+
+    def on_app_done(raw_app_dir: str) -> None:
+        # Batch `full` only reads --raw-root; keep the same app set.
+        if os.path.dirname(os.path.abspath(raw_app_dir)) == raw_root_abs:
+            phase2_q.put(raw_app_dir)
+
+    threads = [
+        threading.Thread(target=phase2_loop, name="full-phase2", daemon=True),
+        threading.Thread(target=phase3_loop, name="full-phase3", daemon=True),
+    ]
+    for t in threads:
+        t.start()
+    try:
+        run_phase1(target, devices=devices, on_app_done=on_app_done)
+    finally:
+        phase2_q.put(None)
+    for t in threads:
+        t.join()
+    if errors:
+        phase2.close()
+        raise errors[0]
+
+    data_process.process_raw_root(raw_root, processed_root, workers=workers, run=phase2)
+    app_dirs = _resolve_phase3_app_dirs(processed_root, app_name=app_name)
+    run_stages([d for d in app_dirs if d not in streamed])
+    _write_phase3_v2_summary(processed_root, app_dirs, stage_stats)
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="llmui unified entry")
     parser.add_argument(
@@ -456,18 +777,37 @@ def main() -> None:
     parser.add_argument("--force", action="store_true", help="force rerun even if output file already exists")
     parser.add_argument("--app", default="", help="run only one app directory name under processed root")
     parser.add_argument("--chain-ids", default="", help="comma-separated chain ids, e.g. 1,3,9")
+    parser.add_argument("--workers", type=int, default=settings.PHASE2_WORKERS, help="phase2 app worker processes")
+    parser.add_argument(
+        "--devices",
+        default=settings.PHASE1_DEVICES,
+        help='phase1 adb devices: "" default device, "all" every attached device, or comma-separated serials',
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        default=settings.FULL_STREAM,
+        help="full mode: run phase2/phase3_v2 on each app as soon as phase1 pulls it",
+    )
+    parser.add_argument(
+        "--scheduler",
+        choices=PHASE3_SCHEDULERS,
+        default=settings.PHASE3_SCHEDULER,
+        help="phase3_v2 semantic/llm stages: app = app by app, global = one chain queue across all apps, "
+        "pipeline = global + each chain's llm request sent as soon as its semantic record is back",
+    )
 
     args = parser.parse_args()
     print(f"[run_id={settings.RUN_ID}] mode={args.mode}")
     chain_ids = _parse_chain_ids(args.chain_ids)
 
     if args.mode == "phase1":
-        run_phase1(args.target)
+        run_phase1(args.target, devices=args.devices)
         return
 
     if args.mode == "phase2":
         raw_root = args.target or args.raw_root
-        run_phase2(raw_root, args.processed_root)
+        run_phase2(raw_root, args.processed_root, workers=args.workers, force=args.force)
         return
 
     if args.mode == "phase3_v2":
@@ -476,6 +816,7 @@ def main() -> None:
             app_name=args.app,
             force=args.force,
             chain_ids=chain_ids,
+            scheduler=args.scheduler,
         )
         return
 
@@ -485,6 +826,7 @@ def main() -> None:
             app_name=args.app,
             force=args.force,
             chain_ids=chain_ids,
+            scheduler=args.scheduler,
         )
         return
 
@@ -497,14 +839,29 @@ def main() -> None:
         )
         return
 
+    if args.mode == "full" and args.stream:
+        run_full_streaming(
+            args.target,
+            raw_root=args.raw_root,
+            processed_root=args.processed_root,
+            devices=args.devices,
+            workers=args.workers,
+            force=args.force,
+            app_name=args.app,
+            chain_ids=chain_ids,
+            scheduler=args.scheduler,
+        )
+        return
+
     if args.mode == "full":
-        run_phase1(args.target)
-        run_phase2(args.raw_root, args.processed_root)
+        run_phase1(args.target, devices=args.devices)
+        run_phase2(args.raw_root, args.processed_root, workers=args.workers, force=args.force)
         run_phase3_v2(
             processed_root=args.processed_root,
             app_name=args.app,
             force=args.force,
             chain_ids=chain_ids,
+            scheduler=args.scheduler,
         )
 
 
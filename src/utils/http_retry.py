@@ -1,14 +1,24 @@
 import time
-from typing import Any, Dict, Iterable, Optional, Set
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
 import os
 from urllib.parse import urlparse
 import ipaddress
+import threading
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from configs import settings
 
 
 DEFAULT_RETRYABLE_STATUS: Set[int] = {429, 500, 502, 503, 504}
 
+# One keep-alive Session per endpoint (scheme://host:port), shared by every
+# thread in the process, so stage workers reuse connections instead of
+# opening a new one per request.
+_SESSIONS: Dict[Tuple[str, bool], requests.Session] = {}
+_SESSIONS_LOCK = threading.Lock()
+
 
 def _is_loopback_url(url: str) -> bool:
     try:
@@ -25,6 +35,71 @@ def _is_loopback_url(url: str) -> bool:
         return False
 
 
+def _endpoint(url: str) -> str:
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
+def pool_size() -> int:
+    """HTTP_POOL_SIZE, or (0 = auto) the largest per-stage LLM concurrency."""
+    if settings.HTTP_POOL_SIZE > 0:
+        return settings.HTTP_POOL_SIZE
+    return max(1, settings.SEMANTIC_CONCURRENCY, settings.COMPLIANCE_CONCURRENCY)
+
+
+def get_session(url: str, trust_env: Optional[bool] = None) -> requests.Session:
+    """
+    Process-wide pooled Session for url's endpoint. trust_env=None keeps the
+    default policy: env proxies are used except for loopback endpoints.
+    """
+    if trust_env is None:
+        # Loopback endpoints should bypass proxy to avoid local proxy hijack.
+        trust_env = not _is_loopback_url(url)
+    key = (_endpoint(url), trust_env)
+    with _SESSIONS_LOCK:
+        session = _SESSIONS.get(key)
+        if session is None:
+            session = requests.Session()
+            session.trust_env = trust_env
+            # Not blocking: threads beyond the pool size still get a connection, it is just not kept.
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size())
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _SESSIONS[key] = session
+        return session
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Per endpoint: requests sent, connections opened, connections currently
+    open (in use + idle keep-alive) and reuse_ratio = share of requests that
+    went over an already open connection.
+    """
+    with _SESSIONS_LOCK:
+        sessions = dict(_SESSIONS)
+    totals: Dict[str, Dict[str, int]] = {}
+    for (endpoint, _), session in sorted(sessions.items()):
+        t = totals.setdefault(endpoint, {"pool_maxsize": 0, "requests": 0, "connections_opened": 0, "open_connections": 0})
+        adapter = session.get_adapter(endpoint + "/")
+        managers = [adapter.poolmanager, *adapter.proxy_manager.values()]
+        for pool in [m.pools.get(k) for m in managers for k in list(m.pools.keys())]:
+            queue = getattr(pool, "pool", None)
+            if queue is None:  # evicted or closed
+                continue
+            idle = [conn for conn in list(queue.queue) if conn is not None]
+            t["requests"] += pool.num_requests
+            t["connections_opened"] += pool.num_connections
+            t["open_connections"] += (queue.maxsize - queue.qsize()) + sum(1 for conn in idle if getattr(conn, "sock", None) is not None)
+            t["pool_maxsize"] = max(t["pool_maxsize"], queue.maxsize)
+    return {
+        endpoint: {
+            **t,
+            "reuse_ratio": round(1 - t["connections_opened"] / t["requests"], 4) if t["requests"] else 0.0,
+        }
+        for endpoint, t in totals.items()
+    }
+
+
 def post_json_with_retry(
     url: str,
     payload: Dict[str, Any],
@@ -43,11 +118,8 @@ def post_json_with_retry(
     status_set = set(retryable_status or DEFAULT_RETRYABLE_STATUS)
     last_exc: Optional[Exception] = None
 
-    session = requests.Session()
-    # Loopback endpoints should bypass proxy to avoid local proxy hijack.
+    session = get_session(url)
     bypass_proxy = _is_loopback_url(url)
-    if bypass_proxy:
-        session.trust_env = False
 
     for attempt in range(max_retries + 1):
         try:
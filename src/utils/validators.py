@@ -1,14 +1,49 @@
 from typing import Any, Dict, List
 
+# Normalized phase2 result.json: every screen stored once, chains reference it by file.
+SCREEN_STORE_FORMAT = "screens-v1"
+_CHAIN_UI_KEYS = ("ui_before_grant", "ui_granting", "ui_after_grant")
+
+
+def expand_screen_store(data: Any) -> Any:
+    """
+    Expand a screen-store result.json
+    ({"format": "screens-v1", "screens": {file: feature}, "chains": [...]})
+    into the legacy list of chains. Expanded entries share the screen's
+    feature dict, so treat them as read-only. Anything else is returned as is.
+    """
+    if not isinstance(data, dict) or data.get("format") != SCREEN_STORE_FORMAT:
+        return data
+    screens = data.get("screens") or {}
+
+    def entry(ref: Any) -> Any:
+        if not isinstance(ref, dict):
+            return ref
+        feature = screens.get(ref.get("file"), {"text": "", "widgets": []})
+        return {**ref, "feature": feature}
+
+    chains = []
+    for item in data.get("chains") or []:
+        if isinstance(item, dict):
+            item = dict(item)
+            for key in _CHAIN_UI_KEYS:
+                if key not in item:
+                    continue
+                ui = item[key]
+                item[key] = [entry(g) for g in ui] if isinstance(ui, list) else entry(ui)
+        chains.append(item)
+    return chains
+
 
 def validate_result_json_chains(chains: Any) -> List[Dict[str, Any]]:
+    chains = expand_screen_store(chains)
     if not isinstance(chains, list):
         raise ValueError("result.json must be a list")
 
     for idx, item in enumerate(chains):
         if not isinstance(item, dict):
             raise ValueError(f"chain[{idx}] must be an object")
-        for key in ("ui_before_grant", "ui_granting", "ui_after_grant"):
+        for key in _CHAIN_UI_KEYS:
             if key not in item:
                 raise ValueError(f"chain[{idx}] missing required field: {key}")
     return chains